@@ -0,0 +1,218 @@
+import duckdb
+import pandas as pd
+import glob
+import os
+import tempfile
+import time
+
+from readManyExcel import consolidar_multiplos_arquivos
+
+# Colunas da base consolidada e a coluna correspondente na exportação do ERP.
+# A ordem é a mesma de readManyExcel.colunas_ordenadas
+colunas_consolidadas = [
+    ('Empresa', 'Empresa'),
+    ('Data', 'Data'),
+    ('Situacao', 'Situação'),
+    ('Usuario', 'Usuário'),
+    ('Solicitação', None),  # chave, tipada na leitura
+    ('Nr_nf', 'Nr. Nf'),
+    ('Sku', 'Sku'),
+    ('Dt_Preventrega', 'Dt. Preventrega'),
+    ('Pedido', 'Pedido'),
+    ('Ds_Prioridade', 'Ds. Prioridade'),
+    ('Ds_Compra', 'Ds. Compra'),
+    ('Vl_Solicitacao_Total', None),  # soma, tipada na leitura
+    ('Cod_Ccusto', 'Cod. Ccusto'),
+    ('Obs_lin1', 'Obs lin1'),
+    ('Obs_lin2', 'Obs lin2'),
+    ('Obs_lin3', 'Obs lin3'),
+    ('Obs_lin4', 'Obs lin4'),
+]
+
+
+def montar_consulta_consolidacao(arquivos):
+    """
+    Monta a consulta SQL que faz toda a consolidação de uma vez:
+
+    1. Leitura de todos os CSVs (tudo como texto, exceto chave e valor, que
+       são convertidos aqui com as mesmas regras do pandas)
+    2. Agrupamento por (arquivo, Solicitação): soma do valor (Kahan, como no
+       groupby do pandas) e 'first' das demais colunas, ignorando nulos e
+       respeitando a ordem das linhas
+    3. Última versão vence: entre arquivos, fica a solicitação do arquivo
+       mais recente (o último na ordem de nomes)
+    """
+    colunas_first = []
+    for nome_saida, coluna_origem in colunas_consolidadas:
+        if coluna_origem is None:
+            continue
+        colunas_first.append(
+            f'first("{coluna_origem}" ORDER BY linha) '
+            f'FILTER (WHERE "{coluna_origem}" IS NOT NULL) AS "{nome_saida}"'
+        )
+
+    colunas_saida = ', '.join(f'"{nome}"' for nome, _ in colunas_consolidadas)
+    lista_arquivos = ', '.join("'" + arquivo.replace("'", "''") + "'" for arquivo in arquivos)
+
+    return f"""
+        WITH linhas AS (
+            SELECT
+                *,
+                row_number() OVER () AS linha,
+                TRY_CAST(trim("Solicitação") AS DOUBLE) AS solicitacao_num,
+                TRY_CAST(
+                    trim(replace(replace("Vl.Solicitação", '.', ''), ',', '.')) AS DOUBLE
+                ) AS valor_num
+            FROM read_csv(
+                [{lista_arquivos}],
+                delim=';', header=true, all_varchar=true,
+                filename=true, union_by_name=true
+            )
+        ),
+        por_arquivo AS (
+            SELECT
+                filename AS arquivo,
+                solicitacao_num AS "Solicitação",
+                {', '.join(colunas_first)},
+                coalesce(kahan_sum(valor_num), 0) AS "Vl_Solicitacao_Total"
+            FROM linhas
+            WHERE solicitacao_num IS NOT NULL
+            GROUP BY arquivo, solicitacao_num
+        )
+        SELECT {colunas_saida}
+        FROM por_arquivo
+        QUALIFY row_number() OVER (PARTITION BY "Solicitação" ORDER BY arquivo DESC) = 1
+        ORDER BY "Solicitação"
+    """
+
+
+def consolidar_multiplos_arquivos_duckdb(padrao_arquivos, arquivo_saida,
+                                         limite_memoria=None, diretorio_temp=None,
+                                         threads=None):
+    """
+    Alternativa a consolidar_multiplos_arquivos() que roda a reconstrução
+    completa como uma única consulta no DuckDB.
+
+    O DuckDB lê os CSVs em paralelo e, se a base não couber em
+    `limite_memoria` (ex.: '2GB'), despeja os agrupamentos em
+    `diretorio_temp`. Assim a reconstrução de todo o histórico não depende
+    de concatenar tudo em memória no pandas.
+
+    O resultado tem as mesmas colunas, na mesma ordem, da versão em pandas.
+    """
+    try:
+        arquivos = glob.glob(padrao_arquivos)
+
+        if not arquivos:
+            print(f"Erro: Nenhum arquivo encontrado com o padrão '{padrao_arquivos}'")
+            return None
+
+        # Mesma ordem da versão em pandas: do mais antigo para o mais recente
+        arquivos.sort()
+
+        print(f"\n{'='*60}")
+        print(f"CONSOLIDANDO {len(arquivos)} ARQUIVO(S) COM DUCKDB")
+        print(f"{'='*60}")
+
+        con = duckdb.connect()
+        try:
+            # A ordem de inserção garante que row_number() siga a ordem das linhas
+            con.execute("SET preserve_insertion_order = true")
+            if limite_memoria:
+                con.execute(f"SET memory_limit = '{limite_memoria}'")
+            if diretorio_temp:
+                con.execute(f"SET temp_directory = '{diretorio_temp}'")
+            if threads:
+                con.execute(f"SET threads = {int(threads)}")
+
+            df_final = con.execute(montar_consulta_consolidacao(arquivos)).df()
+        finally:
+            con.close()
+
+        # A chave sai como DOUBLE para aceitar "123.0"; volta para inteiro
+        df_final['Solicitação'] = df_final['Solicitação'].astype('int64')
+
+        # Arredonda no pandas: o round() do DuckDB arredonda os empates
+        # de forma diferente e mudaria o centavo de alguns totais
+        df_final['Vl_Solicitacao_Total'] = df_final['Vl_Solicitacao_Total'].round(2)
+
+        df_final.to_csv(arquivo_saida, index=False, sep=';', encoding='utf-8')
+
+        print(f"\n{'='*60}")
+        print(f"ARQUIVO FINAL SALVO: {arquivo_saida}")
+        print(f"Total de solicitações únicas: {len(df_final)}")
+        print(f"{'='*60}\n")
+
+        return df_final
+
+    except Exception as e:
+        print(f"Erro ao consolidar arquivos com DuckDB: {e}")
+        return None
+
+
+def normalizar_para_comparacao(df):
+    """
+    Deixa a base no formato em que ela é lida do CSV final: cada valor que
+    for numérico vira número, o resto fica como texto. Assim '31232' e
+    '31232.0' são considerados iguais, como no arquivo salvo.
+    """
+    df_normalizado = df.copy()
+    for coluna in df_normalizado.columns:
+        texto = df_normalizado[coluna].astype('string')
+        numero = pd.to_numeric(texto, errors='coerce')
+        df_normalizado[coluna] = numero.astype(object).where(numero.notna(), texto)
+    return df_normalizado
+
+
+def comparar_engines(padrao_arquivos, diretorio_saida, repeticoes=3):
+    """
+    Roda as duas engines sobre os mesmos arquivos, mede o tempo de cada uma
+    e confere se os arquivos gerados têm o mesmo conteúdo.
+    """
+    saida_pandas = os.path.join(diretorio_saida, 'consolidado_pandas.csv')
+    saida_duckdb = os.path.join(diretorio_saida, 'consolidado_duckdb.csv')
+
+    engines = [
+        ('pandas', consolidar_multiplos_arquivos, saida_pandas),
+        ('duckdb', consolidar_multiplos_arquivos_duckdb, saida_duckdb),
+    ]
+
+    tempos = {}
+    for nome, funcao, saida in engines:
+        medicoes = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao(padrao_arquivos, saida)
+            medicoes.append(time.perf_counter() - inicio)
+        tempos[nome] = min(medicoes)
+
+    df_pandas = normalizar_para_comparacao(pd.read_csv(saida_pandas, delimiter=';', encoding='utf-8'))
+    df_duckdb = normalizar_para_comparacao(pd.read_csv(saida_duckdb, delimiter=';', encoding='utf-8'))
+
+    iguais = (
+        list(df_pandas.columns) == list(df_duckdb.columns)
+        and len(df_pandas) == len(df_duckdb)
+        and bool((df_pandas.isna() & df_duckdb.isna() | (df_pandas == df_duckdb)).all().all())
+    )
+
+    print(f"\n{'='*60}")
+    print("COMPARAÇÃO DE ENGINES")
+    print(f"{'='*60}")
+    for nome, tempo in tempos.items():
+        print(f"  {nome}: {tempo:.3f}s (melhor de {repeticoes})")
+    print(f"  Resultados idênticos: {'sim' if iguais else 'NÃO'}")
+
+    return tempos, iguais
+
+
+# =========================================================
+#  EXECUÇÃO PRINCIPAL
+# =========================================================
+
+if __name__ == "__main__":
+    # Os arquivos das duas engines vão para uma pasta temporária,
+    # para não sobrescrever os relatórios oficiais
+    comparar_engines(
+        padrao_arquivos='planilhas/csv/planilhas_semanais/*/RICARDOALMEIDA*.csv',
+        diretorio_saida=tempfile.mkdtemp()
+    )
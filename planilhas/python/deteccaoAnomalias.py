@@ -0,0 +1,369 @@
+import pandas as pd
+import numpy as np
+import os
+
+from leituraCsv import converter_datas
+
+# =========================================================
+#  ESTADO INCREMENTAL
+# =========================================================
+
+# Dimensões com estatísticas próprias de valor: por prestador e por filial
+dimensoes_estatisticas = ['Prestador', 'Empresa']
+
+# Campos guardados por solicitação analisada: se mudarem numa exportação
+# posterior (Obs corrigida, NF lançada, valor alterado), ela é reavaliada
+colunas_registro = ['Prestador', 'Numero_NF', 'Vl_Solicitacao_Total', 'Empresa']
+
+chaves_nf = ['Prestador', 'Numero_NF', 'Valor_Chave']
+
+colunas_alertas = [
+    'Tipo_Alerta', 'Solicitação', 'Empresa', 'Data', 'Prestador', 'Numero_NF',
+    'Vl_Solicitacao_Total', 'Solicitacao_Referencia', 'Detalhe'
+]
+
+
+def criar_estado_vazio():
+    """
+    Estado guardado entre execuções:
+    - registros: campos de cada solicitação já analisada (colunas_registro);
+      o delta são as que não estão aqui ou cujos campos mudaram
+    - indice_nf: (Prestador, Numero_NF, Valor_Chave) -> primeira Solicitação
+      com essa NF (ver detectar_nf_duplicadas)
+    - estatisticas: por dimensão, n / média / M2 do log do valor
+    """
+    indice_nf = pd.DataFrame(
+        {'Solicitação': pd.Series(dtype='int64')},
+        index=pd.MultiIndex.from_arrays([[], [], []], names=chaves_nf)
+    )
+    estatisticas = {
+        dimensao: pd.DataFrame(
+            {'n': pd.Series(dtype='int64'), 'media': pd.Series(dtype='float64'),
+             'm2': pd.Series(dtype='float64')},
+            index=pd.Index([], name=dimensao)
+        )
+        for dimensao in dimensoes_estatisticas
+    }
+    return {
+        'registros': pd.DataFrame(columns=colunas_registro, index=pd.Index([], dtype='int64', name='Solicitação')),
+        'indice_nf': indice_nf,
+        'estatisticas': estatisticas
+    }
+
+
+def carregar_estado(arquivo_estado):
+    if arquivo_estado and os.path.exists(arquivo_estado):
+        return pd.read_pickle(arquivo_estado)
+    return criar_estado_vazio()
+
+
+def salvar_estado(arquivo_estado, estado):
+    pasta = os.path.dirname(arquivo_estado)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    pd.to_pickle(estado, arquivo_estado)
+
+
+# =========================================================
+#  DETECÇÕES
+# =========================================================
+
+def normalizar_nf(numero_nf):
+    """A NF pode vir lida como número (7651.0) ou texto ('7651')."""
+    return numero_nf.astype(str).str.replace(r'\.0$', '', regex=True).where(numero_nf.notna())
+
+
+def montar_chaves_nf(df):
+    """
+    Linhas com NF informada, com as colunas de chaves_nf preenchidas.
+    """
+    df_nf = df.dropna(subset=['Numero_NF'])
+    numero_nf = normalizar_nf(df_nf['Numero_NF'])
+    df_nf = df_nf.assign(Numero_NF=numero_nf)[numero_nf != '0']
+
+    # Hoje o extrator não devolve prestador quando a observação tem NF. Sem
+    # prestador, a NF sozinha repete entre emissores diferentes, então a
+    # chave passa a incluir o valor: mesma NF com o mesmo valor
+    sem_prestador = df_nf['Prestador'].isna()
+    return df_nf.assign(
+        Prestador=df_nf['Prestador'].fillna(''),
+        Valor_Chave=df_nf['Vl_Solicitacao_Total'].round(2).astype(str).where(sem_prestador, '')
+    )
+
+
+def detectar_nf_duplicadas(df_novos, indice_nf):
+    """
+    Procura a mesma NF do mesmo prestador paga em mais de uma solicitação,
+    tanto contra o histórico (indice_nf) quanto dentro do próprio delta.
+
+    Retorna os alertas e o índice atualizado com as NFs novas.
+    """
+    df_nf = montar_chaves_nf(df_novos)
+
+    # Primeira solicitação de cada NF: a do histórico ou, se a NF é nova,
+    # a primeira do delta
+    primeiras_do_delta = df_nf.drop_duplicates(subset=chaves_nf).set_index(chaves_nf)[['Solicitação']]
+    novas_chaves = primeiras_do_delta[~primeiras_do_delta.index.isin(indice_nf.index)]
+    indice_atualizado = pd.concat([indice_nf, novas_chaves]) if len(indice_nf) else novas_chaves
+
+    referencia = df_nf.join(
+        indice_atualizado.rename(columns={'Solicitação': 'Solicitacao_Referencia'}),
+        on=chaves_nf
+    )
+    duplicadas = referencia[referencia['Solicitação'] != referencia['Solicitacao_Referencia']]
+
+    df_alertas = duplicadas.assign(
+        Tipo_Alerta='NF duplicada',
+        Prestador=duplicadas['Prestador'].replace('', None),
+        Detalhe='NF ' + duplicadas['Numero_NF'] + ' já paga na solicitação '
+                + duplicadas['Solicitacao_Referencia'].astype(str)
+    )
+    return df_alertas.reindex(columns=colunas_alertas), indice_atualizado
+
+
+def combinar_estatisticas(n_a, media_a, m2_a, n_b, media_b, m2_b):
+    """
+    Junta n / média / M2 de dois grupos de valores (método de Chan).
+    Grupos vazios (n = 0) podem ter média e M2 nulos.
+    """
+    n_total = n_a + n_b
+    media_a, m2_a = np.where(n_a > 0, media_a, 0), np.where(n_a > 0, m2_a, 0)
+    media_b, m2_b = np.where(n_b > 0, media_b, 0), np.where(n_b > 0, m2_b, 0)
+    delta = media_b - media_a
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(n_total > 0, media_a + delta * n_b / n_total, 0)
+        m2 = np.where(n_total > 0, m2_a + m2_b + delta ** 2 * n_a * n_b / n_total, 0)
+    return n_total, media, m2
+
+
+def estatisticas_do_lote(df_dimensao, dimensao):
+    lote = df_dimensao.groupby(dimensao)['log_valor'].agg(['count', 'mean', 'var'])
+    lote['m2'] = lote['var'].fillna(0) * (lote['count'] - 1)
+    return lote.rename(columns={'count': 'n', 'mean': 'media'})[['n', 'media', 'm2']]
+
+
+def detectar_valores_atipicos(df_novos, estatisticas, limite_z, minimo_historico):
+    """
+    Compara o valor de cada solicitação nova com o histórico do prestador e
+    da filial. O teste é feito no log do valor (gastos têm cauda longa) e
+    só alerta valores acima do normal, com pelo menos `minimo_historico`
+    solicitações anteriores.
+
+    df_novos precisa vir em ordem de Data / Solicitação: cada linha é
+    comparada com o histórico salvo mais as linhas do delta anteriores a
+    ela, então rodar a base de uma vez ou em vários deltas dá os mesmos
+    alertas. As estatísticas são atualizadas só com o delta (média e M2
+    combinadas pelo método de Chan), então o custo não depende do tamanho
+    da base.
+    """
+    df_valores = df_novos[df_novos['Vl_Solicitacao_Total'] > 0].reset_index(drop=True)
+    log_valor = np.log(df_valores['Vl_Solicitacao_Total'])
+
+    lista_alertas = []
+    estatisticas_atualizadas = {}
+
+    for dimensao in dimensoes_estatisticas:
+        anterior = estatisticas[dimensao]
+        df_dimensao = df_valores.assign(log_valor=log_valor).dropna(subset=[dimensao])
+        grupos = df_dimensao.groupby(dimensao)
+
+        # Estatísticas do delta até a linha anterior a cada uma
+        expandido = grupos['log_valor'].expanding()
+        media_ate = expandido.mean().reset_index(level=0, drop=True).reindex(df_dimensao.index)
+        var_ate = expandido.var().reset_index(level=0, drop=True).reindex(df_dimensao.index)
+        n_antes = grupos.cumcount()
+        media_antes = media_ate.groupby(df_dimensao[dimensao]).shift(1)
+        m2_antes = var_ate.groupby(df_dimensao[dimensao]).shift(1).fillna(0) * (n_antes - 1).clip(lower=0)
+
+        # ... somadas ao histórico salvo
+        historico = df_dimensao[[dimensao]].join(anterior, on=dimensao)
+        n, media, m2 = combinar_estatisticas(
+            historico['n'].fillna(0), historico['media'], historico['m2'],
+            n_antes, media_antes, m2_antes
+        )
+        comparacao = df_dimensao.assign(n=n, media=media, m2=m2)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            desvio = np.sqrt(comparacao['m2'] / (comparacao['n'] - 1))
+        z = (comparacao['log_valor'] - comparacao['media']) / desvio
+        atipicos = comparacao[(comparacao['n'] >= minimo_historico) & (desvio > 0) & (z > limite_z)]
+
+        if len(atipicos):
+            media_historica = np.exp(atipicos['media'])
+            lista_alertas.append(atipicos.assign(
+                Tipo_Alerta=f'Valor atípico ({dimensao})',
+                Detalhe='Valor ' + (atipicos['Vl_Solicitacao_Total'] / media_historica).round(1).astype(str)
+                        + 'x a média histórica de R$ ' + media_historica.round(2).astype(str)
+            ))
+
+        # Junta as estatísticas do delta às do histórico
+        combinado = anterior.join(estatisticas_do_lote(df_dimensao, dimensao), how='outer', rsuffix='_lote')
+        n, media, m2 = combinar_estatisticas(
+            combinado['n'].fillna(0), combinado['media'], combinado['m2'],
+            combinado['n_lote'].fillna(0), combinado['media_lote'], combinado['m2_lote']
+        )
+        estatisticas_atualizadas[dimensao] = pd.DataFrame(
+            {'n': n.astype('int64'), 'media': media, 'm2': m2}, index=combinado.index
+        )
+
+    df_alertas = pd.concat(lista_alertas) if lista_alertas else df_novos.iloc[:0]
+    return df_alertas.reindex(columns=colunas_alertas), estatisticas_atualizadas
+
+
+# =========================================================
+#  SOLICITAÇÕES ALTERADAS
+# =========================================================
+
+def preparar_registros(df):
+    """Os campos de colunas_registro por Solicitação."""
+    registros = df.set_index('Solicitação').reindex(columns=colunas_registro)
+    return registros.assign(Numero_NF=normalizar_nf(registros['Numero_NF']).astype(object))
+
+
+def remover_nf(indice_nf, registros, alteradas):
+    """
+    Tira do índice as NFs cuja referência é uma solicitação alterada. Se
+    outra solicitação já analisada tem a mesma NF, a de menor número passa
+    a ser a referência.
+    """
+    removidas = indice_nf['Solicitação'].isin(alteradas)
+    if not removidas.any():
+        return indice_nf
+
+    df_nf = montar_chaves_nf(registros.drop(index=alteradas).reset_index())
+    df_nf = df_nf[df_nf.set_index(chaves_nf).index.isin(indice_nf.index[removidas])]
+    substitutas = (
+        df_nf.sort_values('Solicitação')
+        .drop_duplicates(subset=chaves_nf)
+        .set_index(chaves_nf)[['Solicitação']]
+    )
+    return pd.concat([indice_nf[~removidas], substitutas])
+
+
+def remover_valores(estatisticas, df_removidos):
+    """
+    Desfaz a contribuição de solicitações nas estatísticas (o inverso da
+    combinação de Chan em combinar_estatisticas).
+    """
+    if df_removidos.empty:
+        return estatisticas
+
+    df_valores = df_removidos[df_removidos['Vl_Solicitacao_Total'] > 0]
+    df_valores = df_valores.assign(log_valor=np.log(df_valores['Vl_Solicitacao_Total']))
+
+    estatisticas_atualizadas = {}
+    for dimensao in dimensoes_estatisticas:
+        atual = estatisticas[dimensao]
+        lote = estatisticas_do_lote(df_valores.dropna(subset=[dimensao]), dimensao).reindex(atual.index)
+        n_lote, media_lote, m2_lote = lote['n'].fillna(0), lote['media'].fillna(0), lote['m2'].fillna(0)
+
+        n = atual['n'] - n_lote
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(n > 0, (atual['n'] * atual['media'] - n_lote * media_lote) / n, 0)
+            delta = media_lote - media
+            m2 = np.where(n > 0, atual['m2'] - m2_lote - delta ** 2 * n * n_lote / atual['n'], 0)
+
+        restantes = pd.DataFrame(
+            {'n': n.astype('int64'), 'media': media, 'm2': np.maximum(m2, 0)}, index=atual.index
+        )
+        estatisticas_atualizadas[dimensao] = restantes[restantes['n'] > 0]
+    return estatisticas_atualizadas
+
+
+# =========================================================
+#  PROCESSAMENTO PRINCIPAL
+# =========================================================
+
+def detectar_anomalias(df_analise, arquivo_estado=None, arquivo_saida=None,
+                       limite_z=3.0, minimo_historico=5):
+    """
+    Procura NFs pagas em duplicidade e valores muito acima do usual nas
+    solicitações do relatório analítico (saída de
+    extracaoPrestadores_v2.processar_solicitacoes_para_analise).
+
+    Com `arquivo_estado`, só as solicitações ainda não analisadas são
+    verificadas e o histórico é atualizado com elas. Assim a atualização
+    semanal custa proporcional ao delta, e não à base inteira.
+    Solicitações já analisadas cujo Prestador, Numero_NF, valor ou Empresa
+    mudaram são reavaliadas: a NF e o valor antigos saem do histórico antes.
+    """
+    try:
+        estado = carregar_estado(arquivo_estado)
+        anteriores = estado['registros']
+
+        df_analise = df_analise.drop_duplicates(subset=['Solicitação'], keep='last')
+        registros = preparar_registros(df_analise)
+
+        # Já analisadas com algum campo diferente do que foi analisado
+        comuns = registros.index.intersection(anteriores.index)
+        atuais, antigos = registros.loc[comuns], anteriores.loc[comuns]
+        iguais = ((atuais == antigos) | (atuais.isna() & antigos.isna())).all(axis=1)
+        alteradas = comuns[~iguais.to_numpy()]
+
+        indice_nf = remover_nf(estado['indice_nf'], anteriores, alteradas)
+        estatisticas = remover_valores(estado['estatisticas'], anteriores.loc[alteradas])
+
+        solicitacoes = df_analise['Solicitação']
+        df_novos = df_analise[~solicitacoes.isin(anteriores.index) | solicitacoes.isin(alteradas)]
+        # Em ordem de data e solicitação: a mais antiga é a referência da NF
+        # e cada valor é comparado só com os anteriores a ele
+        df_novos = (
+            df_novos.assign(_data=converter_datas(df_novos['Data']))
+            .sort_values(['_data', 'Solicitação'])
+            .drop(columns='_data')
+        )
+        print(f"Solicitações para análise: {len(df_novos)} de {len(df_analise)} "
+              f"({len(alteradas)} alteradas)")
+
+        alertas_nf, indice_nf = detectar_nf_duplicadas(df_novos, indice_nf)
+        alertas_valor, estatisticas = detectar_valores_atipicos(
+            df_novos, estatisticas, limite_z, minimo_historico
+        )
+
+        lista_alertas = [df for df in [alertas_nf, alertas_valor] if len(df)]
+        if lista_alertas:
+            df_alertas = pd.concat(lista_alertas, ignore_index=True)
+        else:
+            df_alertas = alertas_nf
+        df_alertas = df_alertas.sort_values(['Tipo_Alerta', 'Solicitação']).reset_index(drop=True)
+
+        print(f"\n{'='*60}")
+        print("ANOMALIAS ENCONTRADAS")
+        print(f"{'='*60}")
+        print(f"NFs duplicadas: {len(alertas_nf)}")
+        print(f"Valores atípicos: {len(alertas_valor)}")
+
+        if arquivo_estado:
+            registros_delta = registros.loc[df_novos['Solicitação']]
+            if len(anteriores):
+                registros_delta = pd.concat([anteriores.drop(index=alteradas), registros_delta])
+            estado = {
+                'registros': registros_delta,
+                'indice_nf': indice_nf,
+                'estatisticas': estatisticas
+            }
+            salvar_estado(arquivo_estado, estado)
+
+        if arquivo_saida:
+            df_alertas.to_csv(arquivo_saida, index=False, sep=';', encoding='utf-8')
+            print(f"\nAlertas salvos em: {arquivo_saida}")
+
+        return df_alertas
+
+    except Exception as e:
+        print(f"Erro ao detectar anomalias: {e}")
+        return None
+
+
+# =========================================================
+#  EXECUÇÃO PRINCIPAL
+# =========================================================
+
+if __name__ == "__main__":
+    df_analise = pd.read_csv('planilhas/relatorio_analitico.csv', delimiter=';', encoding='utf-8')
+
+    df_alertas = detectar_anomalias(
+        df_analise,
+        arquivo_estado='planilhas/cache/estado_anomalias.pkl',
+        arquivo_saida='planilhas/alertas_anomalias.csv'
+    )
@@ -1,6 +1,16 @@
 import pandas as pd
 import re
 
+# Colunas da saída de relacionar_com_prestadores(): as de
+# processar_solicitacoes_para_analise() com as informações do prestador
+# logo após o nome
+colunas_enriquecidas = [
+    'Empresa', 'Data', 'Prestador', 'CNPJ', 'Contato', 'Email', 'Telefone',
+    'Solicitação', 'Pedido', 'Vl_Solicitacao_Total', 'Dt_Preventrega',
+    'Ds_Prioridade', 'Usuario', 'Situacao', 'Ds_Compra', 'Observacoes'
+]
+
+
 def extrair_nome_prestador(obs1, obs2, obs3, obs4):
     """
     Extrai o nome do prestador das colunas de observação.
@@ -205,14 +215,7 @@ def relacionar_com_prestadores(df_analise, arquivo_prestadores, arquivo_saida=No
         df_enriquecido = df_enriquecido.drop('Nome_Prestador', axis=1)
 
         # Reordena as colunas colocando informações do prestador logo após o nome
-        colunas_ordenadas = [
-            'Empresa', 'Data', 'Prestador', 'CNPJ', 'Contato', 'Email', 'Telefone',
-            'Solicitação', 'Pedido', 'Vl_Solicitacao_Total', 'Data_Prev',
-            'Prioridade', 'Usuario', 'Situacao', 'Descricao',
-            'Obs_lin1', 'Obs_lin2', 'Obs_lin3', 'Obs_lin4', 'Observacoes'
-        ]
-
-        df_enriquecido = df_enriquecido[colunas_ordenadas]
+        df_enriquecido = df_enriquecido[colunas_enriquecidas]
 
         # Estatísticas
         prestadores_com_cnpj = df_enriquecido['CNPJ'].notna().sum()
@@ -232,37 +235,38 @@ def relacionar_com_prestadores(df_analise, arquivo_prestadores, arquivo_saida=No
 
 # ==================== EXEMPLO DE USO ====================
 
-# PASSO 1: Processar o arquivo de solicitações e extrair prestadores
-print("="*60)
-print("PASSO 1: PROCESSANDO SOLICITAÇÕES")
-print("="*60)
+if __name__ == "__main__":
+    # PASSO 1: Processar o arquivo de solicitações e extrair prestadores
+    print("="*60)
+    print("PASSO 1: PROCESSANDO SOLICITAÇÕES")
+    print("="*60)
+
+    df_analise = processar_solicitacoes_para_analise(
+        arquivo_entrada='planilhas/csv/relatorio_ate_20-10-2025.csv',
+        arquivo_saida='planilhas/solicitacoes_para_analise.csv'
+    )
+
+    # PASSO 2: Criar base de prestadores para preenchimento manual
+    if df_analise is not None:
+        print("\n" + "="*60)
+        print("PASSO 2: CRIANDO BASE DE PRESTADORES")
+        print("="*60)
 
-df_analise = processar_solicitacoes_para_analise(
-    arquivo_entrada='planilhas/csv/relatorio_ate_20-10-2025.csv',
-    arquivo_saida='planilhas/solicitacoes_para_analise.csv'
-)
+        df_prestadores = criar_base_prestadores(
+            df_analise,
+            arquivo_saida='planilhas/base_prestadores.csv'
+        )
 
-# PASSO 2: Criar base de prestadores para preenchimento manual
-if df_analise is not None:
+    # PASSO 3: Depois que você preencher a base de prestadores manualmente,
+    # use este código para relacionar tudo
+    """
     print("\n" + "="*60)
-    print("PASSO 2: CRIANDO BASE DE PRESTADORES")
+    print("PASSO 3: RELACIONANDO COM BASE DE PRESTADORES")
     print("="*60)
 
-    df_prestadores = criar_base_prestadores(
+    df_final = relacionar_com_prestadores(
         df_analise,
-        arquivo_saida='planilhas/base_prestadores.csv'
+        arquivo_prestadores='planilhas/base_prestadores.csv',
+        arquivo_saida='planilhas/solicitacoes_completas.csv'
     )
-
-# PASSO 3: Depois que você preencher a base de prestadores manualmente,
-# use este código para relacionar tudo
-"""
-print("\n" + "="*60)
-print("PASSO 3: RELACIONANDO COM BASE DE PRESTADORES")
-print("="*60)
-
-df_final = relacionar_com_prestadores(
-    df_analise,
-    arquivo_prestadores='planilhas/base_prestadores.csv',
-    arquivo_saida='planilhas/solicitacoes_completas.csv'
-)
-"""
+    """
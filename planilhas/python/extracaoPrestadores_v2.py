@@ -1,5 +1,10 @@
 import pandas as pd
+import numpy as np
+import hashlib
+import inspect
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 
 # =========================================================
 #  FUNÇÕES DE EXTRAÇÃO E CLASSIFICAÇÃO
@@ -89,17 +94,165 @@ def extrair_descricao_item(obs_list):
     return None
 
 
+# =========================================================
+#  CACHE DAS EXTRAÇÕES
+# =========================================================
+
+colunas_obs = ['Obs_lin1', 'Obs_lin2', 'Obs_lin3', 'Obs_lin4']
+colunas_extraidas = ['Prestador', 'Tipo', 'Numero_NF', 'Vencimento_NF', 'Descricao_Item']
+
+# Colunas do relatório analítico, na ordem de saída
+colunas_analise = [
+    'Empresa', 'Data', 'Prestador', 'Tipo', 'Descricao_Item',
+    'Solicitação', 'Pedido', 'Vl_Solicitacao_Total',
+    'Dt_Preventrega', 'Ds_Prioridade', 'Usuario',
+    'Situacao', 'Numero_NF', 'Vencimento_NF'
+]
+
+
+def extrair_campos_observacoes(obs1, obs2, obs3, obs4):
+    """
+    Aplica todas as extrações a uma combinação de observações.
+    Retorna os valores na ordem de `colunas_extraidas`.
+    """
+    obs_list = [obs1, obs2, obs3, obs4]
+    numero_nf = next(
+        (extrair_nf(str(v)) for v in obs_list if v and extrair_nf(str(v))), None)
+    vencimento = next(
+        (extrair_vencimento(str(v)) for v in obs_list if v and extrair_vencimento(str(v))), None)
+    return (
+        extrair_nome_prestador(obs1, obs2, obs3, obs4),
+        identificar_tipo(obs_list),
+        numero_nf,
+        vencimento,
+        extrair_descricao_item(obs_list)
+    )
+
+
+def extrair_campos_lote(linhas):
+    """
+    Aplica extrair_campos_observacoes() a uma lista de tuplas de observações.
+    Fica no nível do módulo para poder ser enviada aos processos do pool.
+    """
+    return [extrair_campos_observacoes(*linha) for linha in linhas]
+
+
+def extrair_campos_em_paralelo(linhas, processos):
+    """
+    Divide as combinações em fatias e processa cada uma em um processo
+    separado, fugindo do GIL nas regex. As fatias voltam na mesma ordem.
+
+    Só as combinações distintas (e ainda fora do cache) são enviadas, então
+    o volume copiado para os processos é pequeno perto da base inteira.
+    """
+    # Algumas fatias por processo para equilibrar textos mais longos
+    fatias = [list(f) for f in np.array_split(np.arange(len(linhas)), processos * 4) if len(f)]
+    lotes = [[linhas[i] for i in fatia] for fatia in fatias]
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        resultados = executor.map(extrair_campos_lote, lotes)
+        return [campos for lote in resultados for campos in lote]
+
+
+def versao_regras_extracao():
+    """
+    Identifica a versão das regras de extração pelo código das funções.
+    Qualquer mudança em uma regra gera outra versão e invalida o cache.
+    """
+    funcoes = [
+        extrair_nome_prestador, identificar_tipo, extrair_nf,
+        extrair_vencimento, extrair_descricao_item, extrair_campos_observacoes
+    ]
+    codigo = "".join(inspect.getsource(f) for f in funcoes)
+    return hashlib.sha1(codigo.encode('utf-8')).hexdigest()
+
+
+def carregar_cache_extracoes(arquivo_cache, versao):
+    """
+    Lê a tabela de extrações já feitas. Se o arquivo não existir ou for
+    de outra versão das regras, começa uma tabela vazia.
+    """
+    if arquivo_cache and os.path.exists(arquivo_cache):
+        cache = pd.read_pickle(arquivo_cache)
+        if cache.get('versao') == versao:
+            # Mesmo dtype de extrair_campos_unicos para o merge das observações
+            return cache['tabela'].astype({c: object for c in colunas_obs})
+        print("Regras de extração mudaram, cache descartado")
+    return pd.DataFrame(columns=colunas_obs + colunas_extraidas, dtype=object)
+
+
+def salvar_cache_extracoes(arquivo_cache, versao, tabela):
+    pasta = os.path.dirname(arquivo_cache)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    pd.to_pickle({'versao': versao, 'tabela': tabela}, arquivo_cache)
+
+
+def extrair_campos_unicos(df, arquivo_cache=None, processos=None):
+    """
+    Extrai os campos de todas as linhas processando cada combinação
+    distinta de (Obs_lin1..Obs_lin4) uma única vez.
+
+    As mesmas observações se repetem milhares de vezes, então o custo passa
+    a depender do número de textos distintos e não do número de linhas.
+    Com `arquivo_cache`, as combinações já vistas em execuções anteriores
+    nem são reprocessadas. Com `processos` > 1, as combinações novas são
+    extraídas em paralelo (ver extrair_campos_em_paralelo).
+    """
+    # Coluna de observação toda vazia é lida como float64: com dtype fixo
+    # o merge com o cache não depende do conteúdo de cada exportação
+    obs = df.reindex(columns=colunas_obs).astype(object)
+
+    # Código de cada linha = posição da sua combinação em `unicos`
+    codigos = obs.groupby(colunas_obs, dropna=False, sort=False).ngroup().to_numpy()
+    unicos = obs.drop_duplicates().reset_index(drop=True)
+    print(f"Combinações de observações distintas: {len(unicos)} de {len(df)} linhas")
+
+    versao = versao_regras_extracao()
+    cache = carregar_cache_extracoes(arquivo_cache, versao)
+
+    unicos = unicos.merge(cache, on=colunas_obs, how='left')
+    pendentes = unicos['Tipo'].isna()
+    print(f"Combinações encontradas no cache: {(~pendentes).sum()}")
+
+    if pendentes.any():
+        linhas = list(unicos.loc[pendentes, colunas_obs].itertuples(index=False, name=None))
+        if processos and processos > 1:
+            print(f"Extraindo {len(linhas)} combinações com {processos} processos")
+            novos = extrair_campos_em_paralelo(linhas, processos)
+        else:
+            novos = extrair_campos_lote(linhas)
+        unicos.loc[pendentes, colunas_extraidas] = pd.DataFrame(
+            novos, columns=colunas_extraidas, index=unicos.index[pendentes]
+        ).astype(object)
+
+        if arquivo_cache:
+            tabela = pd.concat([cache, unicos[pendentes]], ignore_index=True)
+            salvar_cache_extracoes(arquivo_cache, versao, tabela)
+
+    # Devolve cada resultado para todas as linhas com a mesma combinação
+    resultado = unicos[colunas_extraidas].take(codigos)
+    resultado.index = df.index
+    return resultado
+
+
 # =========================================================
 #  PROCESSAMENTO PRINCIPAL
 # =========================================================
 
-def processar_solicitacoes_para_analise(arquivo_entrada, arquivo_saida=None):
+def processar_solicitacoes_para_analise(arquivo_entrada, arquivo_saida=None, arquivo_cache=None,
+                                        processos=None):
     """
     Processa o arquivo CSV de solicitações e gera uma versão analítica com:
     - Prestador
     - Tipo (Compra / Serviço / Produto / Outro)
     - NF e vencimento
     - Descrição do item (quando houver)
+
+    Se `arquivo_cache` for informado, as extrações ficam salvas nele e são
+    reaproveitadas nas próximas execuções (ver extrair_campos_unicos).
+    Em bases grandes, `processos` (ex.: os.cpu_count()) divide a extração
+    entre vários processos.
     """
     try:
         print(f"Lendo o arquivo: {arquivo_entrada}")
@@ -109,46 +262,8 @@ def processar_solicitacoes_para_analise(arquivo_entrada, arquivo_saida=None):
         # -------------------------------
         # EXTRAÇÃO DE CAMPOS ADICIONAIS
         # -------------------------------
-        print("\nExtraindo nomes dos prestadores...")
-        df['Prestador'] = df.apply(
-            lambda row: extrair_nome_prestador(
-                row.get('Obs_lin1'), row.get('Obs_lin2'),
-                row.get('Obs_lin3'), row.get('Obs_lin4')
-            ),
-            axis=1
-        )
-
-        df['Tipo'] = df.apply(
-            lambda row: identificar_tipo([
-                row.get('Obs_lin1'), row.get('Obs_lin2'),
-                row.get('Obs_lin3'), row.get('Obs_lin4')
-            ]),
-            axis=1
-        )
-
-        print("Extraindo informações de NF e vencimento...")
-        df['Numero_NF'] = df.apply(
-            lambda r: next(
-                (extrair_nf(str(v)) for v in [r.get('Obs_lin1'), r.get('Obs_lin2'), r.get('Obs_lin3'), r.get('Obs_lin4')]
-                 if v and extrair_nf(str(v))), None),
-            axis=1
-        )
-
-        df['Vencimento_NF'] = df.apply(
-            lambda r: next(
-                (extrair_vencimento(str(v)) for v in [r.get('Obs_lin1'), r.get('Obs_lin2'), r.get('Obs_lin3'), r.get('Obs_lin4')]
-                 if v and extrair_vencimento(str(v))), None),
-            axis=1
-        )
-
-        print("Extraindo descrições de serviço/produto/compra...")
-        df['Descricao_Item'] = df.apply(
-            lambda row: extrair_descricao_item([
-                row.get('Obs_lin1'), row.get('Obs_lin2'),
-                row.get('Obs_lin3'), row.get('Obs_lin4')
-            ]),
-            axis=1
-        )
+        print("\nExtraindo prestador, tipo, NF, vencimento e descrição...")
+        df[colunas_extraidas] = extrair_campos_unicos(df, arquivo_cache, processos)
 
         # -------------------------------
         # NORMALIZAÇÃO DE CAMPOS
@@ -159,13 +274,6 @@ def processar_solicitacoes_para_analise(arquivo_entrada, arquivo_saida=None):
         # -------------------------------
         # ORGANIZAÇÃO DAS COLUNAS
         # -------------------------------
-        colunas_analise = [
-            'Empresa', 'Data', 'Prestador', 'Tipo', 'Descricao_Item',
-            'Solicitação', 'Pedido', 'Vl_Solicitacao_Total',
-            'Dt_Preventrega', 'Ds_Prioridade', 'Usuario',
-            'Situacao', 'Numero_NF', 'Vencimento_NF'
-        ]
-
         df_analise = df[colunas_analise].copy()
         df_analise = df_analise.sort_values(['Data', 'Empresa'], ascending=[False, True])
 
@@ -207,7 +315,8 @@ if __name__ == "__main__":
 
     df_analise = processar_solicitacoes_para_analise(
         arquivo_entrada='planilhas/csv/relatorio_ate_20-10-2025.csv',
-        arquivo_saida='planilhas/relatorio_analitico.csv'
+        arquivo_saida='planilhas/relatorio_analitico.csv',
+        arquivo_cache='planilhas/cache/extracao_observacoes.pkl'
     )
 
     if df_analise is not None:
@@ -1,6 +1,8 @@
 import pandas as pd
 import glob
 
+from leituraCsv import ler_csv_exportacao
+
 try:
     df_servicos = pd.read_csv('planilhas/RICARDOALMEIDA_1858_MANT ES_geral_utf8_20-10-2025.csv', delimiter=';', encoding='utf-8')
     padrao_arquivo = 'planilhas/csv/*/RICARDOALMEIDA*.csv'
@@ -14,7 +16,7 @@ try:
 
         for arquivo in arquivos_ricardo:
             print(f"Lendo o arquivo: {arquivo}")
-            df_temp = pd.read_csv(arquivo, delimiter=';', encoding='utf-8')
+            df_temp = ler_csv_exportacao(arquivo)
 
             # Normalizações
             df_temp['Solicitação'] = pd.to_numeric(df_temp['Solicitação'], errors='coerce')
@@ -0,0 +1,99 @@
+import pandas as pd
+import codecs
+import csv
+import glob
+
+# Codificações tentadas, nesta ordem, quando o arquivo não tem BOM
+encodings_candidatos = ['utf-8', 'cp1252']
+delimitadores_candidatos = ';,\t|'
+
+
+def detectar_formato(arquivo, tamanho_amostra=64 * 1024):
+    """
+    Descobre encoding e delimitador de um CSV exportado do ERP lendo só o
+    começo do arquivo.
+
+    - BOM UTF-8 -> 'utf-8-sig' (o BOM não vai parar no nome da 1ª coluna)
+    - sem BOM, 'utf-8' se a amostra decodifica, senão 'cp1252' (exportações
+      antigas, que eram convertidas na mão para os arquivos *_utf8)
+
+    A quebra de linha não precisa ser detectada: o parser C do pandas já
+    aceita '\n' e '\r\n' (e lineterminator só aceita um caractere).
+    """
+    with open(arquivo, 'rb') as f:
+        amostra = f.read(tamanho_amostra)
+
+    if amostra.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        encoding = encodings_candidatos[-1]
+        for candidato in encodings_candidatos[:-1]:
+            try:
+                # final=False: a amostra pode cortar um caractere no meio
+                codecs.getincrementaldecoder(candidato)().decode(amostra, final=False)
+                encoding = candidato
+                break
+            except UnicodeDecodeError:
+                continue
+
+    texto = codecs.getincrementaldecoder(encoding)(errors='replace').decode(amostra, final=False)
+    linhas = texto.splitlines()
+    try:
+        # O cabeçalho sozinho basta e evita confusão com vírgulas nos valores
+        delimitador = csv.Sniffer().sniff(linhas[0] if linhas else '', delimitadores_candidatos).delimiter
+    except csv.Error:
+        delimitador = ';'
+
+    return {'encoding': encoding, 'delimitador': delimitador}
+
+
+def ler_csv_exportacao(arquivo, **kwargs):
+    """
+    Lê um CSV do ERP detectando o formato (ver detectar_formato).
+
+    O arquivo é mapeado em memória e decodificado direto pelo parser do
+    pandas, sem gerar antes uma cópia convertida para UTF-8 no disco.
+    Colunas extras sem nome e totalmente vazias (os ';;;;;' no fim das
+    linhas da planilha geral) são descartadas.
+
+    Argumentos extras são repassados para pd.read_csv.
+    """
+    formato = detectar_formato(arquivo)
+
+    df = pd.read_csv(
+        arquivo,
+        delimiter=formato['delimitador'],
+        encoding=formato['encoding'],
+        memory_map=True,
+        **kwargs
+    )
+
+    # Garante cabeçalhos limpos mesmo se o BOM vier duplicado ou com espaços
+    df.columns = [str(c).lstrip('\ufeff').strip() for c in df.columns]
+
+    sem_nome_vazias = [c for c in df.columns if c.startswith('Unnamed:') and df[c].isna().all()]
+    if sem_nome_vazias:
+        df = df.drop(columns=sem_nome_vazias)
+
+    return df
+
+
+def converter_datas(serie):
+    """
+    Converte datas no formato do ERP (dd/mm/aaaa) e no das saídas do
+    pipeline (aaaa-mm-dd, ex.: relatório analítico). O formato é fixo:
+    deixar o pandas adivinhar pela primeira linha troca dia e mês.
+    Valores em nenhum dos dois formatos viram NaT.
+    """
+    datas = pd.to_datetime(serie, format='%d/%m/%Y', errors='coerce')
+    return datas.fillna(pd.to_datetime(serie, format='ISO8601', errors='coerce'))
+
+
+# =========================================================
+#  EXECUÇÃO PRINCIPAL
+# =========================================================
+
+if __name__ == "__main__":
+    for arquivo in sorted(glob.glob('planilhas/csv/**/*.csv', recursive=True)):
+        formato = detectar_formato(arquivo)
+        print(f"{arquivo}: {formato['encoding']}, '{formato['delimitador']}'")
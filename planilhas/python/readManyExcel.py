@@ -3,18 +3,119 @@ import glob
 import os
 from datetime import datetime
 
-def processar_arquivo_individual(arquivo):
+from leituraCsv import ler_csv_exportacao
+from validacaoDados import carregar_codigos_empresa, salvar_relatorio_qualidade, validar_exportacao
+
+# Colunas que vêm de uma única linha da solicitação (as demais são somadas),
+# no formato nome_na_base: nome_na_exportação
+colunas_por_linha = {
+    'Empresa': 'Empresa',
+    'Data': 'Data',
+    'Situacao': 'Situação',
+    'Usuario': 'Usuário',
+    'Nr_nf': 'Nr. Nf',
+    'Sku': 'Sku',
+    'Dt_Preventrega': 'Dt. Preventrega',
+    'Pedido': 'Pedido',
+    'Ds_Prioridade': 'Ds. Prioridade',
+    'Ds_Compra': 'Ds. Compra',
+    'Cod_Ccusto': 'Cod. Ccusto',
+    'Obs_lin1': 'Obs lin1',
+    'Obs_lin2': 'Obs lin2',
+    'Obs_lin3': 'Obs lin3',
+    'Obs_lin4': 'Obs lin4'
+}
+
+# Colunas da base consolidada, na ordem de saída
+colunas_ordenadas = [
+    'Empresa', 'Data', 'Situacao', 'Usuario', 'Solicitação',
+    'Nr_nf', 'Sku', 'Dt_Preventrega', 'Pedido', 'Ds_Prioridade',
+    'Ds_Compra', 'Vl_Solicitacao_Total', 'Cod_Ccusto',
+    'Obs_lin1', 'Obs_lin2', 'Obs_lin3', 'Obs_lin4'
+]
+
+# Modos de agregação aceitos por processar_arquivo_individual()
+modos_agregacao = ['first', 'maior_valor', 'ultima_linha']
+
+
+def agregar_por_linha_representativa(df_limpo, modo_agregacao):
+    """
+    Agrupa as solicitações escolhendo UMA linha representativa por
+    solicitação e copiando dela todas as colunas de uma vez.
+
+    Diferente do 'first' coluna a coluna (que pula NaN e pode misturar a
+    Obs_lin1 de um item com o Nr_nf de outro), aqui o registro inteiro
+    vem do mesmo item:
+      - 'maior_valor': item de maior Vl.Solicitação (empate: o primeiro)
+      - 'ultima_linha': último item da solicitação no arquivo
+    """
+    df_limpo = df_limpo.reset_index(drop=True)
+
+    if modo_agregacao == 'maior_valor':
+        # Valores inválidos perdem para qualquer valor válido, mas um grupo
+        # só com valores inválidos ainda tem sua linha escolhida
+        ordem = df_limpo['Vl.Solicitação'].fillna(float('-inf'))
+    else:
+        ordem = pd.Series(df_limpo.index, index=df_limpo.index)
+
+    indices = ordem.groupby(df_limpo['Solicitação']).idxmax()
+
+    # Um único take para todas as colunas
+    df_agrupado = df_limpo.loc[indices.values, ['Solicitação'] + list(colunas_por_linha.values())]
+    df_agrupado.columns = ['Solicitação'] + list(colunas_por_linha.keys())
+    df_agrupado = df_agrupado.reset_index(drop=True)
+
+    # Soma dos valores de todos os itens (indices está ordenado por Solicitação)
+    df_agrupado['Vl_Solicitacao_Total'] = (
+        df_limpo.groupby('Solicitação')['Vl.Solicitação'].sum().values
+    )
+
+    # Mesma ordem de colunas do modo 'first'
+    colunas = list(colunas_por_linha.keys())
+    posicao_valor = colunas.index('Cod_Ccusto')
+    colunas.insert(posicao_valor, 'Vl_Solicitacao_Total')
+    return df_agrupado[['Solicitação'] + colunas]
+
+
+def processar_arquivo_individual(arquivo, modo_agregacao='first', codigos_empresa=None,
+                                 diretorio_quarentena=None):
     """
     Processa um único arquivo CSV, agrupando solicitações duplicadas
     e somando seus valores.
 
     Este é o primeiro filtro: elimina duplicatas DENTRO do mesmo arquivo.
+
+    modo_agregacao define de onde vêm as colunas que não são somadas:
+      - 'first' (padrão): primeiro valor não nulo de cada coluna
+      - 'maior_valor' / 'ultima_linha': todas de uma mesma linha,
+        ver agregar_por_linha_representativa()
+
+    Com `codigos_empresa` (ver validacaoDados.carregar_codigos_empresa), o
+    arquivo passa pela validação logo após a leitura: linhas reprovadas vão
+    para a quarentena em `diretorio_quarentena` e o resultado da validação
+    entra em relatorio_qualidade.csv no mesmo diretório.
     """
+    if modo_agregacao not in modos_agregacao:
+        print(f"     ✗ Erro: modo_agregacao '{modo_agregacao}' inválido, use um de {modos_agregacao}")
+        return None
+
     try:
         print(f"\n  → Lendo: {os.path.basename(arquivo)}")
 
-        # Lê o arquivo com as configurações corretas
-        df = pd.read_csv(arquivo, delimiter=';', encoding='utf-8')
+        # Lê o arquivo detectando encoding (UTF-8 com/sem BOM ou cp1252) e delimitador
+        df = ler_csv_exportacao(arquivo)
+
+        if codigos_empresa is not None:
+            df, relatorio = validar_exportacao(df, arquivo, codigos_empresa, diretorio_quarentena)
+            if diretorio_quarentena:
+                salvar_relatorio_qualidade(
+                    relatorio, os.path.join(diretorio_quarentena, 'relatorio_qualidade.csv')
+                )
+            if df is None:
+                print(f"     ✗ Arquivo rejeitado, colunas faltando: {relatorio['Colunas_Faltando']}")
+                return None
+            if relatorio['Linhas_Quarentena']:
+                print(f"     ! {relatorio['Linhas_Quarentena']} linha(s) enviadas para a quarentena")
 
         # Normaliza o número da solicitação para garantir que seja numérico
         df['Solicitação'] = pd.to_numeric(df['Solicitação'], errors='coerce')
@@ -36,24 +137,27 @@ def processar_arquivo_individual(arquivo):
         # Agrupa por solicitação, somando os valores duplicados
         # Cada solicitação pode ter múltiplos itens, então somamos os valores
         # mas mantemos apenas o primeiro registro das outras informações
-        df_agrupado = df_limpo.groupby('Solicitação').agg(
-            Empresa=('Empresa', 'first'),
-            Data=('Data', 'first'),
-            Situacao=('Situação', 'first'),
-            Usuario=('Usuário', 'first'),
-            Nr_nf=('Nr. Nf', 'first'),
-            Sku=('Sku', 'first'),
-            Dt_Preventrega=('Dt. Preventrega', 'first'),
-            Pedido=('Pedido', 'first'),
-            Ds_Prioridade=('Ds. Prioridade', 'first'),
-            Ds_Compra=('Ds. Compra', 'first'),
-            Vl_Solicitacao_Total=('Vl.Solicitação', 'sum'),
-            Cod_Ccusto=('Cod. Ccusto', 'first'),
-            Obs_lin1=('Obs lin1', 'first'),
-            Obs_lin2=('Obs lin2', 'first'),
-            Obs_lin3=('Obs lin3', 'first'),
-            Obs_lin4=('Obs lin4', 'first')
-        ).reset_index()
+        if modo_agregacao == 'first':
+            df_agrupado = df_limpo.groupby('Solicitação').agg(
+                Empresa=('Empresa', 'first'),
+                Data=('Data', 'first'),
+                Situacao=('Situação', 'first'),
+                Usuario=('Usuário', 'first'),
+                Nr_nf=('Nr. Nf', 'first'),
+                Sku=('Sku', 'first'),
+                Dt_Preventrega=('Dt. Preventrega', 'first'),
+                Pedido=('Pedido', 'first'),
+                Ds_Prioridade=('Ds. Prioridade', 'first'),
+                Ds_Compra=('Ds. Compra', 'first'),
+                Vl_Solicitacao_Total=('Vl.Solicitação', 'sum'),
+                Cod_Ccusto=('Cod. Ccusto', 'first'),
+                Obs_lin1=('Obs lin1', 'first'),
+                Obs_lin2=('Obs lin2', 'first'),
+                Obs_lin3=('Obs lin3', 'first'),
+                Obs_lin4=('Obs lin4', 'first')
+            ).reset_index()
+        else:
+            df_agrupado = agregar_por_linha_representativa(df_limpo, modo_agregacao)
 
         # Arredonda para 2 casas decimais
         df_agrupado['Vl_Solicitacao_Total'] = df_agrupado['Vl_Solicitacao_Total'].round(2)
@@ -67,7 +171,8 @@ def processar_arquivo_individual(arquivo):
         return None
 
 
-def consolidar_multiplos_arquivos(padrao_arquivos, arquivo_saida):
+def consolidar_multiplos_arquivos(padrao_arquivos, arquivo_saida, modo_agregacao='first',
+                                  arquivo_filiais=None, diretorio_quarentena=None):
     """
     Consolida múltiplos arquivos CSV em uma única base, eliminando duplicatas
     entre arquivos (isso resolve o problema de datas sobrepostas).
@@ -75,6 +180,10 @@ def consolidar_multiplos_arquivos(padrao_arquivos, arquivo_saida):
     Este é o segundo filtro: elimina duplicatas ENTRE arquivos diferentes.
     Quando a mesma solicitação aparecer em múltiplos arquivos, mantemos
     apenas a versão mais recente (a do último arquivo processado).
+
+    modo_agregacao é repassado para processar_arquivo_individual().
+    Com `arquivo_filiais`, cada arquivo é validado antes de ser agrupado
+    (quarentena e relatório de qualidade em `diretorio_quarentena`).
     """
     try:
         # Busca todos os arquivos que correspondem ao padrão
@@ -88,6 +197,9 @@ def consolidar_multiplos_arquivos(padrao_arquivos, arquivo_saida):
         # Isso garante que processamos do mais antigo para o mais recente
         arquivos.sort()
 
+        # Códigos de empresa para a validação (lidos uma vez para todos os arquivos)
+        codigos_empresa = carregar_codigos_empresa(arquivo_filiais) if arquivo_filiais else None
+
         print(f"\n{'='*60}")
         print(f"CONSOLIDANDO {len(arquivos)} ARQUIVO(S)")
         print(f"{'='*60}")
@@ -96,7 +208,9 @@ def consolidar_multiplos_arquivos(padrao_arquivos, arquivo_saida):
 
         # Processa cada arquivo individualmente
         for arquivo in arquivos:
-            df_processado = processar_arquivo_individual(arquivo)
+            df_processado = processar_arquivo_individual(
+                arquivo, modo_agregacao, codigos_empresa, diretorio_quarentena
+            )
             if df_processado is not None:
                 lista_dataframes.append(df_processado)
 
@@ -123,12 +237,6 @@ def consolidar_multiplos_arquivos(padrao_arquivos, arquivo_saida):
         df_final = df_final.sort_values('Solicitação').reset_index(drop=True)
 
         # Reordena as colunas
-        colunas_ordenadas = [
-            'Empresa', 'Data', 'Situacao', 'Usuario', 'Solicitação',
-            'Nr_nf', 'Sku', 'Dt_Preventrega', 'Pedido', 'Ds_Prioridade',
-            'Ds_Compra', 'Vl_Solicitacao_Total', 'Cod_Ccusto',
-            'Obs_lin1', 'Obs_lin2', 'Obs_lin3', 'Obs_lin4'
-        ]
         df_final = df_final[colunas_ordenadas]
 
         # Salva o resultado
@@ -146,13 +254,19 @@ def consolidar_multiplos_arquivos(padrao_arquivos, arquivo_saida):
         return None
 
 
-def adicionar_novos_dados_semanais(arquivo_base, padrao_novos_arquivos, arquivo_saida):
+def adicionar_novos_dados_semanais(arquivo_base, padrao_novos_arquivos, arquivo_saida,
+                                   modo_agregacao='first', arquivo_filiais=None,
+                                   diretorio_quarentena=None):
     """
     Adiciona novos dados semanais a uma base existente.
 
     Use esta função quando você já tem uma base consolidada e quer adicionar
     dados da semana seguinte. A função garante que não haverá duplicatas
     mesmo se houver sobreposição de datas.
+
+    modo_agregacao é repassado para processar_arquivo_individual().
+    Com `arquivo_filiais`, cada arquivo é validado antes de ser agrupado
+    (quarentena e relatório de qualidade em `diretorio_quarentena`).
     """
     try:
         print(f"\n{'='*60}")
@@ -172,11 +286,14 @@ def adicionar_novos_dados_semanais(arquivo_base, padrao_novos_arquivos, arquivo_
             return None
 
         arquivos_novos.sort()
+        codigos_empresa = carregar_codigos_empresa(arquivo_filiais) if arquivo_filiais else None
         print(f"\n  → Processando {len(arquivos_novos)} arquivo(s) novo(s)")
 
         lista_novos = []
         for arquivo in arquivos_novos:
-            df_processado = processar_arquivo_individual(arquivo)
+            df_processado = processar_arquivo_individual(
+                arquivo, modo_agregacao, codigos_empresa, diretorio_quarentena
+            )
             if df_processado is not None:
                 lista_novos.append(df_processado)
 
@@ -218,28 +335,29 @@ def adicionar_novos_dados_semanais(arquivo_base, padrao_novos_arquivos, arquivo_
 
 # ==================== EXEMPLOS DE USO ====================
 
-# CENÁRIO 1: Primeira vez - processar múltiplos arquivos históricos
-# Use quando estiver começando e tiver vários arquivos para consolidar
-print("\n" + "🔷" * 30)
-print("CENÁRIO 1: CONSOLIDAÇÃO INICIAL")
-print("🔷" * 30)
-"""
-# Exemplo: você tem arquivos de diferentes semanas na pasta planilhas/csv/
-# Todos seguem o padrão RICARDOALMEIDA*.csv
-resultado = consolidar_multiplos_arquivos(
-    padrao_arquivos='planilhas/csv/planilhas_semanais/*/RICARDOALMEIDA*.csv',
-    arquivo_saida='planilhas/csv/planilhas_relatorios/relatorio_ate_27-10-2025.csv'
-)
-"""
-# CENÁRIO 2: Atualizações semanais
-print("\n" + "🔶" * 30)
-print("CENÁRIO 2: ATUALIZAÇÃO SEMANAL (EXEMPLO)")
-print("🔶" * 30)
-
-# Atualização semanal
-resultado_atualizado = adicionar_novos_dados_semanais(
-    arquivo_base='planilhas/csv/planilha_geral/planilha_geral_ate_20-10-2025.csv',
-    padrao_novos_arquivos='planilhas/csv/planilhas_semanais/*/RICARDOALMEIDA*.csv',
-    arquivo_saida='planilhas/csv/planilhas_relatorios/relatorio_ate_27-10-2025.csv'
-)
+if __name__ == "__main__":
 
+    # CENÁRIO 1: Primeira vez - processar múltiplos arquivos históricos
+    # Use quando estiver começando e tiver vários arquivos para consolidar
+    print("\n" + "🔷" * 30)
+    print("CENÁRIO 1: CONSOLIDAÇÃO INICIAL")
+    print("🔷" * 30)
+    """
+    # Exemplo: você tem arquivos de diferentes semanas na pasta planilhas/csv/
+    # Todos seguem o padrão RICARDOALMEIDA*.csv
+    resultado = consolidar_multiplos_arquivos(
+        padrao_arquivos='planilhas/csv/planilhas_semanais/*/RICARDOALMEIDA*.csv',
+        arquivo_saida='planilhas/csv/planilhas_relatorios/relatorio_ate_27-10-2025.csv'
+    )
+    """
+    # CENÁRIO 2: Atualizações semanais
+    print("\n" + "🔶" * 30)
+    print("CENÁRIO 2: ATUALIZAÇÃO SEMANAL (EXEMPLO)")
+    print("🔶" * 30)
+
+    # Atualização semanal
+    resultado_atualizado = adicionar_novos_dados_semanais(
+        arquivo_base='planilhas/csv/planilha_geral/planilha_geral_ate_20-10-2025.csv',
+        padrao_novos_arquivos='planilhas/csv/planilhas_semanais/*/RICARDOALMEIDA*.csv',
+        arquivo_saida='planilhas/csv/planilhas_relatorios/relatorio_ate_27-10-2025.csv'
+    )
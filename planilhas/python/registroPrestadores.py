@@ -0,0 +1,265 @@
+import pandas as pd
+import os
+import re
+import unicodedata
+from collections import defaultdict
+
+from leituraCsv import ler_csv_exportacao
+
+# Sufixos societários: não ajudam a diferenciar prestadores
+sufixos_societarios = {'LTDA', 'ME', 'EPP', 'EIRELI', 'SA', 'S/A', 'MEI', 'CIA'}
+
+# Palavras que aparecem nas observações mas não em nomes de prestador.
+# Um nome extraído com qualquer uma delas é descartado como ruído
+palavras_ruido = {
+    'NF', 'NOTA', 'DANFE', 'BOLETO', 'PAGAMENTO', 'VENCIMENTO', 'REFERENTE',
+    'LINK', 'EMAIL', 'E-MAIL', 'ENVIADO', 'ENVIADA', 'POSTERIORMENTE', 'FAVOR',
+    'SEGUIR', 'MODELO', 'MATERIAL', 'MATERIAIS', 'ENTREGUE', 'COMPRA', 'ORCAMENTO',
+    'CONTRATO', 'ADIANTADO', 'PARCELA', 'ROLO',
+    # descrições de serviço que o extrator confunde com nome
+    'MANUT', 'ANUT', 'MANUTENCAO', 'PREVENTIVA', 'CONDICIONADO', 'VISITA',
+    'VITRINE', 'ZELADORIA', 'OBRA'
+}
+
+colunas_registro = [
+    'Nome_Extraido', 'Nome_Normalizado', 'ID_Entidade', 'Nome_Canonico',
+    'CNPJ', 'Similaridade', 'Origem', 'Ocorrencias'
+]
+
+
+# =========================================================
+#  NORMALIZAÇÃO E SIMILARIDADE
+# =========================================================
+
+def normalizar_nome(nome):
+    """
+    Deixa o nome comparável: maiúsculas, sem acento, sem pontuação, sem
+    números (CNPJ/CPF no começo do nome) e sem sufixo societário.
+    Ex.: '49.528.049 Aldo Ribeiro de Almeida - ME' -> 'ALDO RIBEIRO DE ALMEIDA'
+    """
+    if pd.isna(nome):
+        return ''
+    texto = unicodedata.normalize('NFKD', str(nome).upper())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^A-Z&\s]', ' ', texto)
+    tokens = [t for t in texto.split() if t not in sufixos_societarios]
+    return ' '.join(tokens)
+
+
+def eh_ruido(nome_normalizado):
+    tokens = nome_normalizado.split()
+    if len(tokens) < 2:
+        return True
+    return any(t in palavras_ruido for t in tokens)
+
+
+def chaves_bloqueio(tokens):
+    """
+    Só nomes que compartilham uma chave são comparados entre si: o primeiro
+    token e o token mais longo. Evita comparar todos contra todos.
+    """
+    chaves = {'P:' + tokens[0]}
+    chaves.add('L:' + max(tokens, key=len))
+    return chaves
+
+
+def similaridade_tokens(tokens_a, tokens_b):
+    """Jaccard entre os conjuntos de tokens."""
+    a, b = set(tokens_a), set(tokens_b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# =========================================================
+#  REGISTRO
+# =========================================================
+
+def carregar_cadastro(arquivo_prestadores):
+    """
+    Lê o cadastro oficial (CNPJ;NOME) como entidades canônicas.
+    """
+    df_cadastro = ler_csv_exportacao(arquivo_prestadores, dtype=str)
+    df_cadastro = df_cadastro.rename(columns={'NOME': 'Nome_Canonico'})
+    df_cadastro = df_cadastro.dropna(subset=['Nome_Canonico'])
+    df_cadastro['Nome_Canonico'] = df_cadastro['Nome_Canonico'].str.strip()
+    df_cadastro['Nome_Normalizado'] = df_cadastro['Nome_Canonico'].map(normalizar_nome)
+    df_cadastro['ID_Entidade'] = 'C' + df_cadastro['CNPJ'].str.replace(r'\D', '', regex=True)
+    return df_cadastro[['ID_Entidade', 'Nome_Canonico', 'CNPJ', 'Nome_Normalizado']]
+
+
+def carregar_registro(arquivo_registro):
+    if arquivo_registro and os.path.exists(arquivo_registro):
+        df_registro = pd.read_csv(arquivo_registro, delimiter=';', encoding='utf-8', dtype={'CNPJ': str})
+        return df_registro.reindex(columns=colunas_registro)
+    return pd.DataFrame(columns=colunas_registro)
+
+
+def adicionar_ao_indice(indice, id_entidade, nome_canonico, cnpj, nome_normalizado):
+    """
+    Registra uma variante de nome de uma entidade no índice.
+
+    O índice guarda as entidades conhecidas (do cadastro e já propostas)
+    e, para cada chave de bloqueio, as entidades que a possuem. Assim os
+    candidatos de um nome saem sem varrer o registro todo.
+    """
+    tokens = nome_normalizado.split()
+    if not tokens:
+        return
+    entidade = indice['entidades'].setdefault(
+        id_entidade, {'nome': nome_canonico, 'cnpj': cnpj, 'variantes': []}
+    )
+    entidade['variantes'].append(tokens)
+    for chave in chaves_bloqueio(tokens):
+        indice['blocos'][chave].add(id_entidade)
+
+
+def melhor_candidato(indice, tokens):
+    """
+    Entidade mais parecida com o nome entre as que dividem uma chave de
+    bloqueio com ele. Retorna (id_entidade, similaridade).
+    """
+    candidatos = set()
+    for chave in chaves_bloqueio(tokens):
+        candidatos |= indice['blocos'].get(chave, set())
+
+    melhor, melhor_similaridade = None, 0.0
+    for id_entidade in sorted(candidatos):
+        for variante in indice['entidades'][id_entidade]['variantes']:
+            similaridade = similaridade_tokens(tokens, variante)
+            if similaridade > melhor_similaridade:
+                melhor, melhor_similaridade = id_entidade, similaridade
+    return melhor, melhor_similaridade
+
+
+def atualizar_registro_prestadores(nomes_extraidos, arquivo_prestadores, arquivo_registro=None,
+                                   limiar_similaridade=0.6, minimo_ocorrencias=2):
+    """
+    Constrói (ou atualiza) o registro de prestadores a partir dos nomes
+    extraídos das observações, no lugar da planilha de preenchimento manual
+    de criar_base_prestadores().
+
+    Para cada nome ainda não registrado:
+    - nomes com palavras de observação (NF, EMAIL, LINK...) são descartados
+    - se parecer com uma entidade do cadastro (Jaccard >= limiar), vira
+      variante dela e herda o CNPJ
+    - senão, nomes parecidos entre si formam uma entidade proposta (sem
+      CNPJ), desde que apareçam pelo menos `minimo_ocorrencias` vezes
+
+    Só os nomes novos são processados; o registro salvo guarda os já vistos
+    e quantas vezes cada um apareceu (Ocorrencias, somada a cada execução).
+    Nomes raros e sem correspondência ficam com Origem 'pendente' e são
+    reavaliados quando o total chega a `minimo_ocorrencias`, então rodar
+    os lotes semanais um a um dá o mesmo registro que rodar tudo de uma vez.
+    """
+    try:
+        df_cadastro = carregar_cadastro(arquivo_prestadores)
+        df_registro = carregar_registro(arquivo_registro)
+
+        indice = {'entidades': {}, 'blocos': defaultdict(set)}
+        for linha in df_cadastro.itertuples(index=False):
+            adicionar_ao_indice(indice, linha.ID_Entidade, linha.Nome_Canonico, linha.CNPJ, linha.Nome_Normalizado)
+        conhecidos = df_registro[~df_registro['Origem'].isin(['descartado', 'pendente'])]
+        for linha in conhecidos.itertuples(index=False):
+            adicionar_ao_indice(indice, linha.ID_Entidade, linha.Nome_Canonico, linha.CNPJ, linha.Nome_Normalizado)
+
+        # Frequência de cada nome no lote, somada ao total já registrado
+        ocorrencias = pd.Series(nomes_extraidos).dropna().astype(str).str.strip().value_counts()
+        totais = df_registro.set_index('Nome_Extraido')['Ocorrencias'].fillna(0).add(ocorrencias, fill_value=0)
+        df_registro['Ocorrencias'] = df_registro['Nome_Extraido'].map(totais).astype('int64')
+
+        # Nomes novos e pendentes, com o total de ocorrências de cada um
+        pendentes = df_registro['Origem'] == 'pendente'
+        novos = ocorrencias[~ocorrencias.index.isin(df_registro['Nome_Extraido'])]
+        print(f"Nomes novos para registrar: {len(novos)}")
+        ocorrencias = pd.concat([
+            novos,
+            df_registro.loc[pendentes].set_index('Nome_Extraido')['Ocorrencias']
+        ]).sort_values(ascending=False, kind='stable')
+        df_registro = df_registro[~pendentes]
+
+        proximo_id = df_registro['ID_Entidade'].astype(str).str.extract(r'^P(\d+)$')[0].astype(float).max()
+        proximo_id = 1 if pd.isna(proximo_id) else int(proximo_id) + 1
+
+        novos_registros = []
+        # Nomes mais frequentes primeiro: viram o nome canônico das propostas
+        for nome, quantidade in ocorrencias.items():
+            nome_normalizado = normalizar_nome(nome)
+            registro = {'Nome_Extraido': nome, 'Nome_Normalizado': nome_normalizado, 'Ocorrencias': quantidade}
+
+            if eh_ruido(nome_normalizado):
+                registro.update(Origem='descartado')
+                novos_registros.append(registro)
+                continue
+
+            id_entidade, similaridade = melhor_candidato(indice, nome_normalizado.split())
+
+            if id_entidade is None or similaridade < limiar_similaridade:
+                if quantidade < minimo_ocorrencias:
+                    registro.update(Origem='pendente')
+                    novos_registros.append(registro)
+                    continue
+                id_entidade = f'P{proximo_id:05d}'
+                proximo_id += 1
+                adicionar_ao_indice(indice, id_entidade, nome.title(), None, nome_normalizado)
+                similaridade = 1.0
+            else:
+                entidade = indice['entidades'][id_entidade]
+                adicionar_ao_indice(indice, id_entidade, entidade['nome'], entidade['cnpj'], nome_normalizado)
+
+            entidade = indice['entidades'][id_entidade]
+            registro.update(
+                ID_Entidade=id_entidade,
+                Nome_Canonico=entidade['nome'],
+                CNPJ=entidade['cnpj'],
+                Similaridade=round(similaridade, 3),
+                Origem='cadastro' if id_entidade.startswith('C') else 'proposta'
+            )
+            novos_registros.append(registro)
+
+        df_novos = pd.DataFrame(novos_registros, columns=colunas_registro)
+        df_registro = pd.concat([df_registro, df_novos], ignore_index=True) if len(df_registro) else df_novos
+
+        print(f"\n{'='*60}")
+        print("REGISTRO DE PRESTADORES ATUALIZADO")
+        print(f"{'='*60}")
+        print(f"Ligados ao cadastro: {(df_novos['Origem'] == 'cadastro').sum()}")
+        print(f"Entidades propostas: {df_novos.loc[df_novos['Origem'] == 'proposta', 'ID_Entidade'].nunique()}")
+        print(f"Descartados como ruído: {(df_novos['Origem'] == 'descartado').sum()}")
+        print(f"Pendentes (menos de {minimo_ocorrencias} ocorrências): {(df_novos['Origem'] == 'pendente').sum()}")
+
+        if arquivo_registro:
+            df_registro.to_csv(arquivo_registro, index=False, sep=';', encoding='utf-8')
+            print(f"Registro salvo em: {arquivo_registro}")
+
+        return df_registro
+
+    except Exception as e:
+        print(f"Erro ao atualizar registro de prestadores: {e}")
+        return None
+
+
+def mapear_prestadores(df_analise, df_registro):
+    """
+    Acrescenta ID_Entidade, Nome_Canonico e CNPJ ao relatório analítico
+    pelo nome extraído (coluna Prestador).
+    """
+    df_validos = df_registro[~df_registro['Origem'].isin(['descartado', 'pendente'])]
+    df_validos = df_validos[['Nome_Extraido', 'ID_Entidade', 'Nome_Canonico', 'CNPJ']]
+    df_mapeado = df_analise.merge(df_validos, left_on='Prestador', right_on='Nome_Extraido', how='left')
+    return df_mapeado.drop(columns='Nome_Extraido')
+
+
+# =========================================================
+#  EXECUÇÃO PRINCIPAL
+# =========================================================
+
+if __name__ == "__main__":
+    df_base = pd.read_csv('planilhas/teste_csv_prestadores/base_prestadores.csv', delimiter=';', encoding='utf-8')
+
+    df_registro = atualizar_registro_prestadores(
+        df_base['Nome_Prestador'],
+        arquivo_prestadores='planilhas/csv/prestadores.csv',
+        arquivo_registro='planilhas/registro_prestadores.csv',
+        minimo_ocorrencias=1
+    )
@@ -0,0 +1,306 @@
+import pandas as pd
+import contextlib
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from consolidacaoDuckDB import consolidar_multiplos_arquivos_duckdb, normalizar_para_comparacao
+from deteccaoAnomalias import detectar_anomalias
+from extracaoPrestadores_v2 import processar_solicitacoes_para_analise
+from leituraCsv import converter_datas
+from readManyExcel import adicionar_novos_dados_semanais, consolidar_multiplos_arquivos
+
+# Fixtures do repositório usadas como entrada e como resultado esperado
+base_ate_20_10 = 'planilhas/csv/planilha_geral/planilha_geral_ate_20-10-2025.csv'
+exportacao_geral = 'planilhas/csv/planilha_geral/RICARDOALMEIDA_1858_MANT ES_geral_utf8_20-10-2025.csv'
+padrao_semanais = 'planilhas/csv/planilhas_semanais/outubro/RICARDOALMEIDA*.csv'
+relatorio_ate_20_10 = 'planilhas/csv/planilhas_relatorios/relatorio_ate_20-10-2025.csv'
+esperado_consolidacao = 'planilhas/csv/planilhas_relatorios/relatorio_ate_27-10-2025.csv'
+esperado_extracao = 'planilhas/relatorio_analitico.csv'
+
+
+# =========================================================
+#  COMPARAÇÃO
+# =========================================================
+
+def comparar_por_chave(df_esperado, df_obtido, chave='Solicitação'):
+    """
+    Compara dois DataFrames alinhando as linhas pela chave (a ordem das
+    linhas não importa). `chave` é uma coluna ou uma lista de colunas.
+    Retorna uma linha por diferença:
+    - Coluna '<linha ausente>' / '<linha extra>' para chaves que só existem
+      em um dos lados
+    - Coluna '<coluna ausente>' / '<coluna extra>' para diferenças de esquema
+    - senão, a coluna e os dois valores da célula diferente
+
+    Valores numéricos são comparados como número ('31232' == '31232.0'),
+    como ficam ao ler o CSV salvo.
+    """
+    colunas_chave = [chave] if isinstance(chave, str) else list(chave)
+    esperado = normalizar_para_comparacao(df_esperado).set_index(colunas_chave)
+    obtido = normalizar_para_comparacao(df_obtido).set_index(colunas_chave)
+
+    def valores_chave(valor):
+        return dict(zip(colunas_chave, valor if len(colunas_chave) > 1 else [valor]))
+
+    diferencas = []
+    for coluna in esperado.columns.difference(obtido.columns):
+        diferencas.append({'Coluna': '<coluna ausente>', 'Esperado': coluna, 'Obtido': None})
+    for coluna in obtido.columns.difference(esperado.columns):
+        diferencas.append({'Coluna': '<coluna extra>', 'Esperado': None, 'Obtido': coluna})
+    for valor in esperado.index.difference(obtido.index):
+        diferencas.append({**valores_chave(valor), 'Coluna': '<linha ausente>', 'Esperado': None, 'Obtido': None})
+    for valor in obtido.index.difference(esperado.index):
+        diferencas.append({**valores_chave(valor), 'Coluna': '<linha extra>', 'Esperado': None, 'Obtido': None})
+
+    colunas = esperado.columns.intersection(obtido.columns)
+    chaves = esperado.index.intersection(obtido.index)
+    a = esperado.loc[chaves, colunas]
+    b = obtido.loc[chaves, colunas]
+
+    # Célula diferente: não são ambas nulas e não são iguais
+    diferentes = ~((a.isna() & b.isna()) | (a == b))
+    celulas = diferentes.stack()
+    celulas = celulas[celulas].index
+    colunas_diferencas = colunas_chave + ['Coluna', 'Esperado', 'Obtido']
+    df_diferencas = pd.DataFrame(diferencas, columns=colunas_diferencas)
+    if len(celulas):
+        linhas = [c[:-1] if len(colunas_chave) > 1 else c[0] for c in celulas]
+        nomes_colunas = celulas.get_level_values(-1)
+        df_celulas = pd.DataFrame({
+            **{c: celulas.get_level_values(i) for i, c in enumerate(colunas_chave)},
+            'Coluna': nomes_colunas,
+            'Esperado': [a.at[linha, coluna] for linha, coluna in zip(linhas, nomes_colunas)],
+            'Obtido': [b.at[linha, coluna] for linha, coluna in zip(linhas, nomes_colunas)],
+        })
+        df_diferencas = pd.concat([df_diferencas, df_celulas], ignore_index=True) if diferencas else df_celulas
+
+    return df_diferencas
+
+
+# =========================================================
+#  CASOS
+# =========================================================
+
+def caso_atualizacao_semanal(pasta):
+    saida = os.path.join(pasta, 'atualizacao_semanal.csv')
+    adicionar_novos_dados_semanais(base_ate_20_10, padrao_semanais, saida)
+    return saida
+
+
+def copiar_exportacoes(pasta):
+    """
+    A planilha geral e as semanais ficam em pastas diferentes; a
+    reconstrução completa precisa delas sob um único padrão.
+    """
+    pasta_exportacoes = os.path.join(pasta, 'exportacoes')
+    os.makedirs(pasta_exportacoes, exist_ok=True)
+    for arquivo in [exportacao_geral] + sorted(glob.glob(padrao_semanais)):
+        shutil.copy(arquivo, pasta_exportacoes)
+    return os.path.join(pasta_exportacoes, 'RICARDOALMEIDA*.csv')
+
+
+def caso_reconstrucao_pandas(pasta):
+    saida = os.path.join(pasta, 'reconstrucao_pandas.csv')
+    consolidar_multiplos_arquivos(copiar_exportacoes(pasta), saida)
+    return saida
+
+
+def caso_reconstrucao_duckdb(pasta):
+    saida = os.path.join(pasta, 'reconstrucao_duckdb.csv')
+    consolidar_multiplos_arquivos_duckdb(copiar_exportacoes(pasta), saida)
+    return saida
+
+
+def caso_extracao(pasta):
+    saida = os.path.join(pasta, 'extracao.csv')
+    processar_solicitacoes_para_analise(relatorio_ate_20_10, saida)
+    return saida
+
+
+def caso_extracao_paralela(pasta):
+    saida = os.path.join(pasta, 'extracao_paralela.csv')
+    processar_solicitacoes_para_analise(relatorio_ate_20_10, saida, processos=2)
+    return saida
+
+
+def preparar_extracao_com_cache(pasta):
+    """
+    Cache vazio na pasta do caso e uma cópia do relatório com Obs_lin4
+    toda vazia (lida como float64, não como texto).
+    """
+    arquivo_cache = os.path.join(pasta, 'cache', 'extracao_observacoes.pkl')
+    if os.path.exists(arquivo_cache):
+        # Cache de uma repetição anterior do caso
+        os.remove(arquivo_cache)
+
+    arquivo_obs_vazia = os.path.join(pasta, 'relatorio_obs_lin4_vazia.csv')
+    df = pd.read_csv(relatorio_ate_20_10, delimiter=';', encoding='utf-8')
+    df.assign(Obs_lin4=None).to_csv(arquivo_obs_vazia, index=False, sep=';', encoding='utf-8')
+    return arquivo_cache, arquivo_obs_vazia
+
+
+def caso_extracao_cache_fria(pasta):
+    saida = os.path.join(pasta, 'extracao_cache_fria.csv')
+    arquivo_cache, _ = preparar_extracao_com_cache(pasta)
+    processar_solicitacoes_para_analise(relatorio_ate_20_10, saida, arquivo_cache=arquivo_cache)
+    return saida
+
+
+def caso_extracao_cache_quente(pasta):
+    """
+    Extração com o cache já preenchido por outra exportação, sobre um
+    arquivo com uma coluna de observação vazia. Tem que dar o mesmo
+    resultado da extração sem cache (extracao_obs_vazia).
+    """
+    saida = os.path.join(pasta, 'extracao_cache_quente.csv')
+    arquivo_cache, arquivo_obs_vazia = preparar_extracao_com_cache(pasta)
+    processar_solicitacoes_para_analise(relatorio_ate_20_10, arquivo_cache=arquivo_cache)
+    processar_solicitacoes_para_analise(arquivo_obs_vazia, saida, arquivo_cache=arquivo_cache)
+    return saida
+
+
+def caso_extracao_obs_vazia(pasta):
+    saida = os.path.join(pasta, 'extracao_obs_vazia.csv')
+    _, arquivo_obs_vazia = preparar_extracao_com_cache(pasta)
+    processar_solicitacoes_para_analise(arquivo_obs_vazia, saida)
+    return saida
+
+
+def caso_anomalias_completa(pasta):
+    saida = os.path.join(pasta, 'anomalias_completa.csv')
+    detectar_anomalias(pd.read_csv(esperado_extracao, delimiter=';', encoding='utf-8'), arquivo_saida=saida)
+    return saida
+
+
+def caso_anomalias_incremental(pasta):
+    """
+    Mesma base em duas execuções com o estado salvo entre elas: primeiro
+    as solicitações até 30/06/2024, depois a base inteira (como na
+    atualização semanal). Tem que dar os alertas da análise de uma vez.
+    """
+    saida = os.path.join(pasta, 'anomalias_incremental.csv')
+    arquivo_estado = os.path.join(pasta, 'estado_anomalias.pkl')
+    if os.path.exists(arquivo_estado):
+        # Estado de uma repetição anterior do caso
+        os.remove(arquivo_estado)
+    df_analise = pd.read_csv(esperado_extracao, delimiter=';', encoding='utf-8')
+    primeira = df_analise[converter_datas(df_analise['Data']) <= '2024-06-30']
+
+    lista_alertas = [detectar_anomalias(df, arquivo_estado) for df in [primeira, df_analise]]
+    pd.concat(lista_alertas, ignore_index=True).to_csv(saida, index=False, sep=';', encoding='utf-8')
+    return saida
+
+
+# (nome, função que gera o arquivo, arquivo esperado, chave das linhas).
+# O esperado também pode ser uma função que gera o arquivo de referência
+chave_alertas = ['Tipo_Alerta', 'Solicitação']
+casos_regressao = [
+    ('atualizacao_semanal', caso_atualizacao_semanal, esperado_consolidacao, 'Solicitação'),
+    ('reconstrucao_pandas', caso_reconstrucao_pandas, esperado_consolidacao, 'Solicitação'),
+    ('reconstrucao_duckdb', caso_reconstrucao_duckdb, esperado_consolidacao, 'Solicitação'),
+    ('extracao_v2', caso_extracao, esperado_extracao, 'Solicitação'),
+    ('extracao_v2_paralela', caso_extracao_paralela, esperado_extracao, 'Solicitação'),
+    ('extracao_v2_cache_fria', caso_extracao_cache_fria, esperado_extracao, 'Solicitação'),
+    ('extracao_v2_cache_quente', caso_extracao_cache_quente, caso_extracao_obs_vazia, 'Solicitação'),
+    ('anomalias_incremental', caso_anomalias_incremental, caso_anomalias_completa, chave_alertas),
+]
+
+
+# =========================================================
+#  EXECUÇÃO
+# =========================================================
+
+def rodar_regressao(casos=None, repeticoes=1, arquivo_tempos=None, diretorio_diferencas=None):
+    """
+    Roda cada caso do pipeline sobre as fixtures do repositório, compara o
+    arquivo gerado com o resultado de referência e mede o tempo.
+
+    Cada caso roda `repeticoes` vezes e o tempo registrado é o melhor
+    (quando o esperado é gerado por uma função, ela roda fora da medição).
+    Com `arquivo_tempos`, os resultados são acrescentados a esse CSV
+    (histórico de desempenho). Com `diretorio_diferencas`, as diferenças
+    de cada caso reprovado são salvas em <caso>_diferencas.csv.
+    """
+    resultados = []
+
+    for nome, funcao, esperado, chave in (casos or casos_regressao):
+        with tempfile.TemporaryDirectory() as pasta:
+            medicoes = []
+            saida_pipeline = io.StringIO()
+            try:
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    with contextlib.redirect_stdout(saida_pipeline):
+                        arquivo_obtido = funcao(pasta)
+                    medicoes.append(time.perf_counter() - inicio)
+
+                arquivo_esperado = esperado
+                if callable(esperado):
+                    with contextlib.redirect_stdout(saida_pipeline):
+                        arquivo_esperado = esperado(pasta)
+
+                df_esperado = pd.read_csv(arquivo_esperado, delimiter=';', encoding='utf-8')
+                df_obtido = pd.read_csv(arquivo_obtido, delimiter=';', encoding='utf-8')
+                df_diferencas = comparar_por_chave(df_esperado, df_obtido, chave)
+                status = 'OK' if df_diferencas.empty else 'DIFERENTE'
+                linhas = len(df_obtido)
+            except Exception as e:
+                # A saída do pipeline ajuda a entender a falha
+                print(saida_pipeline.getvalue())
+                print(f"Erro no caso {nome}: {e}")
+                df_diferencas, status, linhas = pd.DataFrame(), 'ERRO', 0
+
+        if diretorio_diferencas and status == 'DIFERENTE':
+            os.makedirs(diretorio_diferencas, exist_ok=True)
+            df_diferencas.to_csv(
+                os.path.join(diretorio_diferencas, f'{nome}_diferencas.csv'),
+                index=False, sep=';', encoding='utf-8'
+            )
+
+        resultados.append({
+            'Data_Execucao': datetime.now().strftime('%d/%m/%Y %H:%M'),
+            'Caso': nome,
+            'Status': status,
+            'Linhas': linhas,
+            'Diferencas': len(df_diferencas),
+            'Tempo_s': round(min(medicoes), 4) if medicoes else None,
+        })
+
+    df_resultados = pd.DataFrame(resultados)
+
+    print(f"\n{'='*60}")
+    print("REGRESSÃO DO PIPELINE")
+    print(f"{'='*60}")
+    for linha in df_resultados.itertuples(index=False):
+        tempo = f"{linha.Tempo_s:.3f}s" if linha.Tempo_s is not None else '-'
+        print(f"  {linha.Caso:<24} {linha.Status:<10} {linha.Diferencas:>6} diferença(s)  {tempo}")
+
+    if arquivo_tempos:
+        pasta = os.path.dirname(arquivo_tempos)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        novo = not os.path.exists(arquivo_tempos)
+        df_resultados.to_csv(arquivo_tempos, mode='a', header=novo, index=False, sep=';', encoding='utf-8')
+
+    return df_resultados
+
+
+# =========================================================
+#  EXECUÇÃO PRINCIPAL
+# =========================================================
+
+if __name__ == "__main__":
+    df_resultados = rodar_regressao(
+        repeticoes=3,
+        arquivo_tempos='planilhas/cache/regressao_tempos.csv',
+        diretorio_diferencas='planilhas/cache/regressao_diferencas'
+    )
+
+    # Código de saída diferente de zero se algum caso mudou o resultado
+    sys.exit(0 if (df_resultados['Status'] == 'OK').all() else 1)
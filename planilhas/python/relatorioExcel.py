@@ -0,0 +1,174 @@
+import pandas as pd
+import re
+import xlsxwriter
+
+from extracaoPrestadores_v2 import colunas_analise
+from leituraCsv import converter_datas, ler_csv_exportacao
+
+# Agrupamentos aceitos para as abas (colunas de filiais.csv)
+agrupamentos_abas = ['Região', 'Nome Filial']
+
+
+def carregar_filiais(arquivo_filiais):
+    """
+    Lê a tabela de filiais (Código -> Nome Filial / Estado / Região).
+    Filiais sem região ficam em 'Sem região'.
+    """
+    df_filiais = ler_csv_exportacao(arquivo_filiais)
+    df_filiais['Região'] = df_filiais['Região'].fillna('Sem região')
+    return df_filiais.rename(columns={'Código': 'Empresa'})
+
+
+def nome_aba_valido(nome, usados):
+    """
+    O Excel não aceita []:*?/\\ no nome da aba, limita a 31 caracteres
+    e não diferencia maiúsculas ao comparar nomes.
+    """
+    base = re.sub(r'[\[\]:*?/\\]', '-', str(nome)).strip()[:31] or 'Sem nome'
+    nome_aba = base
+    contador = 2
+    while nome_aba.lower() in usados:
+        sufixo = f" ({contador})"
+        nome_aba = base[:31 - len(sufixo)] + sufixo
+        contador += 1
+    usados.add(nome_aba.lower())
+    return nome_aba
+
+
+def escrever_aba(workbook, nome_aba, df, formatos):
+    """
+    Escreve um DataFrame em uma aba linha a linha, com o tipo de cada
+    célula preservado (número, data ou texto).
+
+    No modo constant_memory do xlsxwriter cada linha é gravada no disco
+    assim que a próxima começa, então as linhas precisam sair em ordem.
+    """
+    worksheet = workbook.add_worksheet(nome_aba)
+
+    # Um escritor por coluna, escolhido uma vez pelo tipo da coluna
+    escritores = []
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            escritores.append((worksheet.write_datetime, formatos['data'], False))
+        elif coluna == 'Vl_Solicitacao_Total':
+            escritores.append((worksheet.write_number, formatos['moeda'], False))
+        elif pd.api.types.is_numeric_dtype(serie):
+            escritores.append((worksheet.write_number, None, False))
+        else:
+            escritores.append((worksheet.write_string, None, True))
+
+    for coluna_idx, coluna in enumerate(df.columns):
+        worksheet.write_string(0, coluna_idx, coluna, formatos['cabecalho'])
+
+    # Nulos viram None para serem pulados (célula vazia)
+    valores = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    for linha_idx, linha in enumerate(valores, start=1):
+        for coluna_idx, valor in enumerate(linha):
+            if valor is None:
+                continue
+            escrever, formato, texto = escritores[coluna_idx]
+            if texto:
+                valor = str(valor)
+            escrever(linha_idx, coluna_idx, valor, formato)
+
+    if len(df.columns):
+        worksheet.autofilter(0, 0, max(len(df), 1), len(df.columns) - 1)
+    worksheet.freeze_panes(1, 0)
+    return worksheet
+
+
+def exportar_relatorio_excel(df_analise, arquivo_saida, arquivo_filiais,
+                             agrupar_por='Região', colunas=None):
+    """
+    Gera um único XLSX com:
+    - aba 'Resumo': quantidade e valor total por região/filial e tipo
+    - uma aba por região (ou por filial, com agrupar_por='Nome Filial')
+
+    Diferente do CSV com ';', o Excel recebe datas como datas e valores
+    como números. O arquivo é escrito em modo de memória constante, então
+    um relatório com 100 mil linhas não fica inteiro na memória.
+
+    `colunas` define as colunas das abas; o padrão é colunas_analise de
+    extracaoPrestadores_v2. Para a saída de relacionar_com_prestadores(),
+    passe extracaoPrestadores.colunas_enriquecidas.
+    """
+    try:
+        if agrupar_por not in agrupamentos_abas:
+            print(f"Erro: agrupar_por deve ser um de {agrupamentos_abas}, recebido '{agrupar_por}'")
+            return None
+
+        colunas = [c for c in (colunas or colunas_analise) if c in df_analise.columns]
+
+        df_filiais = carregar_filiais(arquivo_filiais)
+        df = df_analise.merge(
+            df_filiais[['Empresa', 'Nome Filial', 'Região']], on='Empresa', how='left'
+        )
+        df[agrupar_por] = df[agrupar_por].fillna('Filial não cadastrada')
+        df['Data'] = converter_datas(df['Data'])
+        # Vencimento_NF vem do texto das observações e às vezes não tem ano
+        # ('22/09'): se algum valor não converte, a coluna fica como texto
+        for coluna in ['Dt_Preventrega', 'Vencimento_NF']:
+            if coluna in df.columns:
+                datas = converter_datas(df[coluna])
+                if datas.notna().sum() == df[coluna].notna().sum():
+                    df[coluna] = datas
+        df['Vl_Solicitacao_Total'] = pd.to_numeric(df['Vl_Solicitacao_Total'], errors='coerce')
+
+        # -------------------------------
+        # RESUMO
+        # -------------------------------
+        dimensoes = [agrupar_por] + (['Tipo'] if 'Tipo' in df.columns else [])
+        df_resumo = (
+            df.groupby(dimensoes, dropna=False)
+            .agg(
+                Solicitacoes=('Solicitação', 'count'),
+                Vl_Solicitacao_Total=('Vl_Solicitacao_Total', 'sum'),
+                Primeira_Data=('Data', 'min'),
+                Ultima_Data=('Data', 'max')
+            )
+            .reset_index()
+        )
+
+        workbook = xlsxwriter.Workbook(arquivo_saida, {'constant_memory': True})
+        formatos = {
+            'cabecalho': workbook.add_format({'bold': True, 'bg_color': '#D9E1F2'}),
+            'data': workbook.add_format({'num_format': 'dd/mm/yyyy'}),
+            'moeda': workbook.add_format({'num_format': '#,##0.00'}),
+        }
+
+        usados = set()
+        escrever_aba(workbook, nome_aba_valido('Resumo', usados), df_resumo, formatos)
+
+        # -------------------------------
+        # UMA ABA POR GRUPO
+        # -------------------------------
+        for grupo, df_grupo in df.groupby(agrupar_por, sort=True):
+            escrever_aba(workbook, nome_aba_valido(grupo, usados), df_grupo[colunas], formatos)
+
+        workbook.close()
+
+        print(f"\n{'='*60}")
+        print(f"RELATÓRIO EXCEL SALVO: {arquivo_saida}")
+        print(f"Abas: {len(usados)} (Resumo + {len(usados) - 1} por {agrupar_por})")
+        print(f"{'='*60}\n")
+
+        return df_resumo
+
+    except Exception as e:
+        print(f"Erro ao exportar relatório Excel: {e}")
+        return None
+
+
+# =========================================================
+#  EXECUÇÃO PRINCIPAL
+# =========================================================
+
+if __name__ == "__main__":
+    df_analise = pd.read_csv('planilhas/relatorio_analitico.csv', delimiter=';', encoding='utf-8')
+
+    exportar_relatorio_excel(
+        df_analise,
+        arquivo_saida='planilhas/relatorio_analitico.xlsx',
+        arquivo_filiais='planilhas/csv/filiais.csv'
+    )
@@ -0,0 +1,242 @@
+import pandas as pd
+import numpy as np
+import os
+
+from leituraCsv import converter_datas, ler_csv_exportacao
+
+# Granularidades mantidas: diária, semanal (semanas começando na segunda) e mensal
+granularidades = ['D', 'W', 'M']
+
+# Dimensões das séries. Nome Filial e Região vêm de filiais.csv pela Empresa;
+# Prestador só existe quando a base já passou pela extração (relatório analítico)
+dimensoes_rollup = ['Cod_Ccusto', 'Nome Filial', 'Região', 'Prestador']
+
+valor_nao_informado = 'Não informado'
+
+
+# =========================================================
+#  PERÍODOS
+# =========================================================
+
+def indice_periodo(datas, granularidade):
+    """
+    Converte datas em um inteiro por período:
+    - 'D': dias desde 01/01/1970
+    - 'W': semanas desde a segunda-feira 29/12/1969
+    - 'M': ano * 12 + mês - 1
+    """
+    dias = datas.to_numpy().astype('datetime64[D]').astype('int64')
+    if granularidade == 'D':
+        return dias
+    if granularidade == 'W':
+        # 01/01/1970 foi uma quinta-feira: +3 alinha as semanas na segunda
+        return (dias + 3) // 7
+    return datas.dt.year.to_numpy() * 12 + datas.dt.month.to_numpy() - 1
+
+
+def inicio_periodo(indices, granularidade):
+    """Data de início de cada período (inverso de indice_periodo)."""
+    indices = np.asarray(indices, dtype='int64')
+    if granularidade == 'D':
+        return pd.to_datetime(indices, unit='D')
+    if granularidade == 'W':
+        return pd.to_datetime(indices * 7 - 3, unit='D')
+    return pd.to_datetime({'year': indices // 12, 'month': indices % 12 + 1, 'day': 1})
+
+
+# =========================================================
+#  ARRAYS DE AGREGADOS
+# =========================================================
+
+def criar_rollup():
+    """
+    Agregados de uma (granularidade, dimensão): matrizes [período, código]
+    com a soma dos valores e a quantidade de solicitações. `inicio` é o
+    período da linha 0 e `codigos` os valores da dimensão, na ordem das colunas.
+    """
+    return {
+        'inicio': None,
+        'codigos': [],
+        'valores': np.zeros((0, 0), dtype='float64'),
+        'contagens': np.zeros((0, 0), dtype='int64')
+    }
+
+
+def aplicar_contribuicoes(rollup, periodos, valores_dimensao, valores, sinal):
+    """
+    Soma (sinal=1) ou remove (sinal=-1) contribuições do rollup, crescendo
+    as matrizes quando aparece período ou código novo.
+    """
+    if len(periodos) == 0:
+        return
+
+    # Códigos novos entram no fim da lista de colunas
+    codigos = pd.Index(rollup['codigos'])
+    novos = pd.Index(pd.unique(valores_dimensao)).difference(codigos)
+    if len(novos):
+        rollup['codigos'] = rollup['codigos'] + list(novos)
+        codigos = pd.Index(rollup['codigos'])
+    colunas = codigos.get_indexer(valores_dimensao)
+
+    # Estende o intervalo de períodos para os dois lados, se preciso
+    inicio_atual = rollup['inicio'] if rollup['inicio'] is not None else int(periodos.min())
+    fim_atual = inicio_atual + rollup['valores'].shape[0]
+    inicio = min(inicio_atual, int(periodos.min()))
+    fim = max(fim_atual, int(periodos.max()) + 1)
+
+    formato = (fim - inicio, len(codigos))
+    if formato != rollup['valores'].shape:
+        deslocamento = inicio_atual - inicio
+        linhas, colunas_antigas = rollup['valores'].shape
+        for chave in ['valores', 'contagens']:
+            matriz = np.zeros(formato, dtype=rollup[chave].dtype)
+            matriz[deslocamento:deslocamento + linhas, :colunas_antigas] = rollup[chave]
+            rollup[chave] = matriz
+    rollup['inicio'] = inicio
+
+    linhas = periodos - inicio
+    np.add.at(rollup['valores'], (linhas, colunas), sinal * valores)
+    np.add.at(rollup['contagens'], (linhas, colunas), sinal)
+
+
+# =========================================================
+#  ATUALIZAÇÃO INCREMENTAL
+# =========================================================
+
+def preparar_contribuicoes(df_base, df_filiais):
+    """
+    Uma linha por solicitação com a data, o valor e o valor de cada
+    dimensão. É o que cada solicitação soma nos rollups.
+    """
+    df = df_base.drop_duplicates(subset=['Solicitação'], keep='last').copy()
+    df['Data'] = converter_datas(df['Data'])
+    df['Vl_Solicitacao_Total'] = pd.to_numeric(df['Vl_Solicitacao_Total'], errors='coerce').fillna(0)
+    df = df.dropna(subset=['Data'])
+
+    if df_filiais is not None:
+        df = df.merge(df_filiais[['Código', 'Nome Filial', 'Região']],
+                      left_on='Empresa', right_on='Código', how='left')
+
+    colunas = [d for d in dimensoes_rollup if d in df.columns]
+    df[colunas] = df[colunas].astype('string').fillna(valor_nao_informado).astype(object)
+    return df.set_index('Solicitação')[['Data', 'Vl_Solicitacao_Total'] + colunas]
+
+
+def aplicar_em_todos(rollups, df_contribuicoes, sinal):
+    for granularidade in granularidades:
+        periodos = indice_periodo(df_contribuicoes['Data'], granularidade)
+        for dimensao in df_contribuicoes.columns.drop(['Data', 'Vl_Solicitacao_Total']):
+            rollup = rollups.setdefault((granularidade, dimensao), criar_rollup())
+            aplicar_contribuicoes(
+                rollup, periodos, df_contribuicoes[dimensao].to_numpy(),
+                df_contribuicoes['Vl_Solicitacao_Total'].to_numpy(), sinal
+            )
+
+
+def atualizar_rollups(df_base, arquivo_filiais=None, arquivo_estado=None):
+    """
+    Atualiza os agregados diários, semanais e mensais de gasto por centro de
+    custo, filial, região e prestador a partir da base consolidada (ou do
+    relatório analítico, que também traz o Prestador).
+
+    Só as solicitações novas ou alteradas desde a última execução são
+    aplicadas: as alteradas têm a contribuição antiga removida e a nova
+    somada. Assim a atualização semanal mexe só no delta.
+    """
+    try:
+        estado = pd.read_pickle(arquivo_estado) if arquivo_estado and os.path.exists(arquivo_estado) else None
+        if estado is None:
+            estado = {'contribuicoes': None, 'rollups': {}}
+
+        df_filiais = ler_csv_exportacao(arquivo_filiais) if arquivo_filiais else None
+        df_novas = preparar_contribuicoes(df_base, df_filiais)
+        anteriores = estado['contribuicoes']
+
+        if anteriores is None:
+            df_alteradas, df_removidas = df_novas, df_novas.iloc[:0]
+        else:
+            df_novas = df_novas.reindex(columns=anteriores.columns, fill_value=valor_nao_informado)
+            comuns = df_novas.index.intersection(anteriores.index)
+            iguais = (df_novas.loc[comuns] == anteriores.loc[comuns]).all(axis=1)
+            mudaram = comuns[~iguais.to_numpy()]
+            df_removidas = anteriores.loc[mudaram]
+            df_alteradas = pd.concat([
+                df_novas.loc[mudaram],
+                df_novas[~df_novas.index.isin(anteriores.index)]
+            ])
+
+        aplicar_em_todos(estado['rollups'], df_removidas, -1)
+        aplicar_em_todos(estado['rollups'], df_alteradas, 1)
+
+        if anteriores is None:
+            estado['contribuicoes'] = df_alteradas
+        else:
+            contribuicoes = anteriores.drop(index=df_removidas.index)
+            estado['contribuicoes'] = pd.concat([contribuicoes, df_alteradas])
+
+        print(f"\n{'='*60}")
+        print("ROLLUPS ATUALIZADOS")
+        print(f"{'='*60}")
+        print(f"Solicitações novas: {len(df_alteradas) - len(df_removidas)}")
+        print(f"Solicitações alteradas: {len(df_removidas)}")
+        print(f"Total no histórico: {len(estado['contribuicoes'])}")
+
+        if arquivo_estado:
+            pasta = os.path.dirname(arquivo_estado)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            pd.to_pickle(estado, arquivo_estado)
+
+        return estado
+
+    except Exception as e:
+        print(f"Erro ao atualizar rollups: {e}")
+        return None
+
+
+# =========================================================
+#  CONSULTA
+# =========================================================
+
+def consultar_serie(estado, dimensao, valores_dimensao=None, granularidade='M',
+                    medida='valor', inicio=None, fim=None):
+    """
+    Devolve a série de gasto pronta para gráfico: um DataFrame com uma
+    linha por período (data de início) e uma coluna por valor da dimensão.
+
+    medida='valor' soma Vl_Solicitacao_Total, medida='quantidade' conta as
+    solicitações. `valores_dimensao` filtra as colunas (ex.: ['Sudeste']) e
+    `inicio`/`fim` filtram os períodos.
+    """
+    rollup = estado['rollups'].get((granularidade, dimensao))
+    if rollup is None or rollup['inicio'] is None:
+        return pd.DataFrame()
+
+    matriz = rollup['valores'] if medida == 'valor' else rollup['contagens']
+    periodos = rollup['inicio'] + np.arange(matriz.shape[0])
+    df_serie = pd.DataFrame(
+        matriz, index=inicio_periodo(periodos, granularidade), columns=rollup['codigos']
+    )
+    df_serie.index.name = 'Periodo'
+
+    if valores_dimensao is not None:
+        df_serie = df_serie.reindex(columns=list(valores_dimensao), fill_value=0)
+    return df_serie.loc[inicio:fim]
+
+
+# =========================================================
+#  EXECUÇÃO PRINCIPAL
+# =========================================================
+
+if __name__ == "__main__":
+    df_base = pd.read_csv('planilhas/csv/planilhas_relatorios/relatorio_ate_27-10-2025.csv',
+                          delimiter=';', encoding='utf-8')
+
+    estado = atualizar_rollups(
+        df_base,
+        arquivo_filiais='planilhas/csv/filiais.csv',
+        arquivo_estado='planilhas/cache/rollups_gastos.pkl'
+    )
+
+    if estado is not None:
+        print(consultar_serie(estado, 'Região', granularidade='M').tail(12).round(2))
@@ -2,6 +2,8 @@ import pandas as pd
 import os
 import glob
 
+from leituraCsv import ler_csv_exportacao
+
 try:
     df_servicos = pd.read_csv('planilhas/csv/Solicitacoes_Geral_28-08-2025.csv', delimiter=';')
     padrao_arquivo = 'planilhas/csv/RICARDOALMEIDA*.csv'
@@ -15,7 +17,7 @@ try:
 
         for arquivo in arquivos_ricardo:
             print(f"Lendo o arquivo: {arquivo}")
-            df_temp = pd.read_csv(arquivo, delimiter=';')
+            df_temp = ler_csv_exportacao(arquivo)
             df_temp['Solicitação'] = pd.to_numeric(df_temp['Solicitação'], errors='coerce')
             df_temp['Vl.Solicitação'] = (
                 df_temp['Vl.Solicitação']
@@ -0,0 +1,123 @@
+import pandas as pd
+import os
+from datetime import datetime
+
+from leituraCsv import ler_csv_exportacao
+
+# Colunas da exportação do ERP usadas na consolidação
+colunas_obrigatorias = [
+    'Empresa', 'Data', 'Situação', 'Usuário', 'Solicitação', 'Nr. Nf', 'Sku',
+    'Dt. Preventrega', 'Pedido', 'Ds. Prioridade', 'Ds. Compra',
+    'Vl.Solicitação', 'Cod. Ccusto', 'Obs lin1', 'Obs lin2', 'Obs lin3', 'Obs lin4'
+]
+
+colunas_relatorio_qualidade = [
+    'Data_Validacao', 'Arquivo', 'Linhas', 'Linhas_Validas', 'Linhas_Quarentena',
+    'Colunas_Faltando', 'Solicitacao_Invalida', 'Data_Invalida',
+    'Valor_Invalido', 'Empresa_Desconhecida'
+]
+
+
+def carregar_codigos_empresa(arquivo_filiais):
+    """
+    Lê os códigos de empresa conhecidos (coluna Código de filiais.csv).
+    """
+    df_filiais = ler_csv_exportacao(arquivo_filiais)
+    return pd.Index(pd.to_numeric(df_filiais['Código'], errors='coerce').dropna().astype('int64'))
+
+
+def verificar_linhas(df, codigos_empresa):
+    """
+    Roda as verificações de linha, cada uma como uma máscara vetorizada.
+    Retorna um DataFrame booleano com uma coluna por verificação
+    (True = a linha falhou).
+    """
+    solicitacao = pd.to_numeric(df['Solicitação'], errors='coerce')
+    data = pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
+
+    # Mesma conversão de processar_arquivo_individual: "1.234,56" -> 1234.56
+    valor_texto = df['Vl.Solicitação'].astype('string').str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    valor = pd.to_numeric(valor_texto.str.strip(), errors='coerce')
+
+    empresa = pd.to_numeric(df['Empresa'], errors='coerce')
+
+    return pd.DataFrame({
+        'Solicitacao_Invalida': solicitacao.isna(),
+        'Data_Invalida': data.isna(),
+        # Valor em branco é como o ERP exporta "sem valor" (a soma conta 0);
+        # só é inválido o valor preenchido que não converte
+        'Valor_Invalido': valor.isna() & df['Vl.Solicitação'].notna(),
+        'Empresa_Desconhecida': ~empresa.isin(codigos_empresa),
+    }, index=df.index)
+
+
+def validar_exportacao(df, arquivo, codigos_empresa, diretorio_quarentena=None):
+    """
+    Valida uma exportação do ERP logo depois da leitura:
+    - todas as colunas obrigatórias existem
+    - Solicitação preenchida e numérica
+    - Data no formato dd/mm/aaaa
+    - Vl.Solicitação numérico, quando preenchido
+    - Empresa cadastrada em filiais.csv
+
+    Se um item de uma solicitação é reprovado, todos os itens dela vão para
+    a quarentena (Motivo_Quarentena 'Outro_Item_Reprovado' nos demais):
+    assim a base não recebe um Vl_Solicitacao_Total parcial.
+
+    Retorna (df_valido, relatorio). Linhas reprovadas saem de df_valido e,
+    com `diretorio_quarentena`, vão para <arquivo>_quarentena.csv nesse
+    diretório com a coluna Motivo_Quarentena. Se faltar coluna obrigatória,
+    df_valido é None e o arquivo inteiro vai para a quarentena.
+    """
+    nome_arquivo = os.path.basename(arquivo)
+    relatorio = dict.fromkeys(colunas_relatorio_qualidade, 0)
+    relatorio.update({
+        'Data_Validacao': datetime.now().strftime('%d/%m/%Y %H:%M'),
+        'Arquivo': nome_arquivo,
+        'Linhas': len(df),
+        'Colunas_Faltando': ''
+    })
+
+    colunas_faltando = [c for c in colunas_obrigatorias if c not in df.columns]
+    if colunas_faltando:
+        relatorio['Colunas_Faltando'] = ', '.join(colunas_faltando)
+        relatorio['Linhas_Quarentena'] = len(df)
+        df_quarentena = df.assign(Motivo_Quarentena='Colunas_Faltando')
+        df_valido = None
+    else:
+        falhas = verificar_linhas(df, codigos_empresa)
+        reprovadas = falhas.any(axis=1)
+        reprovadas = reprovadas | reprovadas.groupby(df['Solicitação']).transform('any').fillna(False).astype(bool)
+
+        for verificacao in falhas.columns:
+            relatorio[verificacao] = int(falhas[verificacao].sum())
+        relatorio['Linhas_Quarentena'] = int(reprovadas.sum())
+        relatorio['Linhas_Validas'] = len(df) - relatorio['Linhas_Quarentena']
+
+        # "Data_Invalida, Valor_Invalido" para cada linha reprovada
+        motivos = falhas[reprovadas].dot(falhas.columns + ', ').str.rstrip(', ')
+        motivos = motivos.mask(motivos == '', 'Outro_Item_Reprovado')
+        df_quarentena = df[reprovadas].assign(Motivo_Quarentena=motivos)
+        df_valido = df[~reprovadas]
+
+    if diretorio_quarentena and len(df_quarentena):
+        os.makedirs(diretorio_quarentena, exist_ok=True)
+        arquivo_quarentena = os.path.join(
+            diretorio_quarentena, os.path.splitext(nome_arquivo)[0] + '_quarentena.csv'
+        )
+        df_quarentena.to_csv(arquivo_quarentena, index=False, sep=';', encoding='utf-8')
+
+    return df_valido, relatorio
+
+
+def salvar_relatorio_qualidade(relatorio, arquivo_relatorio):
+    """
+    Acrescenta o resultado da validação de um arquivo ao relatório de
+    qualidade (um CSV com uma linha por arquivo validado).
+    """
+    pasta = os.path.dirname(arquivo_relatorio)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    df_relatorio = pd.DataFrame([relatorio], columns=colunas_relatorio_qualidade)
+    novo = not os.path.exists(arquivo_relatorio)
+    df_relatorio.to_csv(arquivo_relatorio, mode='a', header=novo, index=False, sep=';', encoding='utf-8')